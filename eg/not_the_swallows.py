@@ -38,13 +38,20 @@ tweedledum = Tweedle('Tweedledum')
 
 ### main ###
 
-publisher = Publisher(
-    characters=(
-        tweedledee,
-        tweedledum,
-    ),
-    setting=downtown,
-    title="TERRIBLE EXAMPLE STORY",
-    #debug=True,
-)
-publisher.publish()
+if __name__ == '__main__':
+    # give a number on the command line to get the same story every time
+    seed = None
+    if len(sys.argv) > 1:
+        seed = int(sys.argv[1])
+
+    publisher = Publisher(
+        characters=(
+            tweedledee,
+            tweedledum,
+        ),
+        setting=downtown,
+        title="TERRIBLE EXAMPLE STORY",
+        seed=seed,
+        #debug=True,
+    )
+    publisher.publish()
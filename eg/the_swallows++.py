@@ -12,13 +12,14 @@ sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
 
 # now we can import the classes we will work with
 from swallows.engine.events import Publisher
+from swallows.engine.seeding import stream
 from swallows.story.characters import MaleCharacter
 from swallows.story.world import (
     alice, bob, house, upstairs_hall,
-    revolver, brandy, dead_body
+    revolver, brandy, dead_body, hide_revolver
 )
 from swallows.engine.objects import (
-    ProperContainer, Item, Location
+    ProperContainer, Item, Location, ProperLocation
 )
 
 # we extend the world of The Swallows by adding a new character.
@@ -50,14 +51,24 @@ pencils = Item('box of pencils', location=desk)
 
 ### main ###
 
-publisher = Publisher(
-    characters=(
-        alice,
-        bob,
-        fred,
-    ),
-    setting=house,
-    title="My _The Swallows_ Fanfic",
-    #debug=True,
-)
-publisher.publish()
+if __name__ == '__main__':
+    # give a number on the command line to get the same story every time
+    seed = None
+    if len(sys.argv) > 1:
+        seed = int(sys.argv[1])
+        hide_revolver(stream(seed, 'world'))
+    else:
+        hide_revolver()
+
+    publisher = Publisher(
+        characters=(
+            alice,
+            bob,
+            fred,
+        ),
+        setting=house,
+        title="My _The Swallows_ Fanfic",
+        seed=seed,
+        #debug=True,
+    )
+    publisher.publish()
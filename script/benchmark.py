@@ -0,0 +1,625 @@
+#!/usr/bin/env python
+
+#
+# benchmark.py: how fast are the engine's hot paths?
+#
+# Usage: benchmark.py run [--world NAME] [--only SUBSTRING] [--quick]
+#                         [--output FILE.json]
+#        benchmark.py compare OLD.json NEW.json [--threshold 0.10]
+#        benchmark.py sizes
+#
+# `run` times each benchmark against each world (the world of The Swallows,
+# the worlds of the examples in eg/, and a big generated world), prints the
+# results, and saves them as JSON.  `compare` lines up two such files and
+# flags every benchmark that got slower by more than the threshold.
+# `sizes` prints how many bytes each kind of Event, Belief and Actor takes.
+#
+
+from __future__ import print_function
+from os.path import realpath, dirname, join
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+
+try:
+    xrange
+except NameError:
+    xrange = range
+
+# get the ../src/ directory onto the Python module search path
+ROOT = join(dirname(realpath(sys.argv[0])), '..')
+sys.path.insert(0, join(ROOT, 'src'))
+
+from swallows.engine.events import (
+    Event, AggregateEvent, EventCollector, ColumnarEventCollector,
+    Oblivion, Editor, IndexedEditor, EventIndex, Publisher,
+    MadeTheirWayToTransformer, DeduplicateTransformer,
+    AggregateEventsTransformer, DetectWanderingTransformer,
+    UsePronounsTransformer, AddWeatherFrifferyTransformer,
+    AddParagraphStartFrifferyTransformer,
+)
+from swallows.engine.objects import (
+    Animate, Male, Item, Location, BeliefSet, ItemLocation, Goal, Desire,
+    BeliefsBelief,
+)
+from swallows.engine.scheduling import RoundRobinScheduler, PriorityScheduler
+from swallows.engine.seeding import stream
+from swallows.engine.sinks import MemorySink
+from swallows.engine.snapshots import (
+    dump_snapshot, load_snapshot, dumps_snapshot, loads_snapshot
+)
+from swallows.story.loader import compile_world, load_world
+
+SEED = 1234
+
+
+### WORLDS ###
+
+# each loader returns (characters, setting).  a snapshot is taken of each
+# world as soon as it is loaded, and every benchmark gets a fresh copy, so
+# that they don't disturb each other (the_swallows++ even extends the world of
+# The Swallows in place, so it has to be loaded last.)
+
+def load_the_swallows():
+    world = load_world(WORLD_DEFINITIONS['the_swallows'],
+                       rng=stream(SEED, 'world'))
+    return ((world.alice, world.bob), world.setting)
+
+
+def load_source(name, filename):
+    """Import a script as a module, the way imp.load_source used to."""
+    try:
+        import importlib.util
+    except ImportError:
+        import imp
+        return imp.load_source(name, filename)
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    # so that pickle can find the classes it defines
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_not_the_swallows():
+    module = load_source('not_the_swallows',
+                         join(ROOT, 'eg', 'not_the_swallows.py'))
+    return ((module.tweedledee, module.tweedledum), module.downtown)
+
+
+def load_the_swallows_plus_plus():
+    module = load_source('the_swallows_plus_plus',
+                         join(ROOT, 'eg', 'the_swallows++.py'))
+    return ((module.alice, module.bob, module.fred), module.house)
+
+
+def load_generated():
+    from swallows.story.generator import generate_world
+    world = generate_world(locations=2000, degree=3, containers_per_room=1,
+                           characters=24, items=200, seed=SEED)
+    return (world.characters, world.setting)
+
+
+# the worlds which are loaded from definitions, and where those are
+WORLD_DEFINITIONS = {
+    'the_swallows': join(ROOT, 'src', 'swallows', 'story', 'house.json'),
+}
+
+WORLDS = (
+    ('the_swallows', load_the_swallows),
+    ('not_the_swallows', load_not_the_swallows),
+    ('the_swallows++', load_the_swallows_plus_plus),
+    ('generated', load_generated),
+)
+
+
+class World(object):
+    def __init__(self, name, loader):
+        self.name = name
+        self.snapshot = dumps_snapshot(loader())
+
+    def fresh(self):
+        """Return (characters, setting) of a fresh copy of the world,
+        with the characters placed and given their own random streams.
+
+        """
+        (characters, setting) = loads_snapshot(self.snapshot)
+        rng = stream(SEED, self.name)
+        collector = Oblivion()
+        for character in characters:
+            character.random = stream(SEED, self.name, character.name)
+            character.collector = collector
+            character.place_in(rng.choice(setting))
+        return (characters, setting)
+
+    def simulate(self, num_events, collector_class=EventCollector):
+        """Return a fresh world's characters, and an EventCollector full
+        of at least num_events events, as in a chapter.
+
+        """
+        (characters, setting) = self.fresh()
+        collector = collector_class()
+        for character in characters:
+            character.collector = collector
+            character.topic = None
+            character.place_in(character.location)
+        while len(collector.events) < num_events:
+            for character in characters:
+                character.live()
+        return (characters, collector)
+
+
+def clone(event):
+    """Return a copy of an event, for when the benchmark is going to let
+    something (a Transformer, say) change it.
+
+    """
+    copy = Event(event.phrase, list(event.participants), excl=event.excl,
+                 previous_location=event.previous_location(),
+                 speaker=event.speaker, addressed_to=event.addressed_to,
+                 exciting=event.exciting)
+    copy.location = event.location
+    return copy
+
+
+def paragraphs_of(world, num_events):
+    """Return the paragraphs (lists of events) an Editor would make from
+    a chapter of about num_events events, before any transforming.
+
+    """
+    (characters, collector) = world.simulate(num_events)
+    editor = Editor(collector, characters, sink=MemorySink(),
+                    rng=stream(SEED, 'editor'))
+    paragraphs = []
+    while editor.more_events():
+        pov_actor = characters[len(paragraphs) % len(characters)]
+        paragraphs.append(editor.generate_paragraph_events(pov_actor))
+    return paragraphs
+
+
+### BENCHMARKS ###
+
+# each benchmark is a function of (world, scale) which sets up whatever it
+# needs, and returns a function that does the actual work and returns how
+# many operations it did.  only the latter is timed.
+
+class Bystander(Male):
+    def live(self):
+        pass
+
+
+def bench_live(world, scale):
+    def run():
+        (characters, setting) = world.fresh()
+        rounds = 2000 * scale
+        for n in xrange(rounds):
+            for character in characters:
+                character.live()
+        return rounds * len(characters)
+    return run
+
+
+def make_scheduler_bench(scheduler_class):
+    def bench(world, scale):
+        def run():
+            (characters, setting) = world.fresh()
+            collector = EventCollector()
+            for character in characters:
+                character.collector = collector
+            scheduler_class(characters).run(collector, 2000 * scale)
+            return collector.num_collected
+        return run
+    return bench
+
+
+def bench_move_to_crowded(world, scale):
+    (characters, setting) = world.fresh()
+    mover = characters[0]
+    here = mover.location
+    there = here.exits[0]
+    for location in (here, there):
+        for n in range(25):
+            bystander = Bystander('bystander %d' % n)
+            bystander.collector = mover.collector
+            bystander.place_in(location)
+    moves = 2000 * scale
+
+    def run():
+        for n in xrange(moves // 2):
+            Animate.move_to(mover, there)
+            Animate.move_to(mover, here)
+        return moves
+    return run
+
+
+def bench_render(world, scale):
+    (characters, collector) = world.simulate(2000 * scale)
+    events = collector.events
+
+    def run():
+        for event in events:
+            event.invalidate()
+            event.render()
+        return len(events)
+    return run
+
+
+def make_load_world_bench(cache):
+    # only for worlds loaded from definitions; skipped for the others
+    def bench(world, scale):
+        definition = WORLD_DEFINITIONS.get(world.name)
+        if definition is None:
+            return None
+        compile_world(definition)
+        worlds = 200 * scale
+
+        def run():
+            for n in xrange(worlds):
+                load_world(definition, rng=stream(SEED, 'world', n),
+                           cache=cache)
+            return worlds
+        return run
+    return bench
+
+
+def make_snapshot_bench(restore):
+    def bench(world, scale):
+        # after a chapter's worth of simulating, so they believe things
+        (characters, collector) = world.simulate(2000)
+        f = io.BytesIO()
+        dump_snapshot(characters, f)
+        snapshots = 2 * scale
+
+        def run():
+            for n in xrange(snapshots):
+                if restore:
+                    f.seek(0)
+                    load_snapshot(f)
+                else:
+                    dump_snapshot(characters, io.BytesIO())
+            return snapshots
+        return run
+    return bench
+
+
+def bench_str_cached(world, scale):
+    (characters, collector) = world.simulate(2000 * scale)
+    events = collector.events
+    for event in events:
+        str(event)
+
+    def run():
+        for n in xrange(10):
+            for event in events:
+                str(event)
+        return 10 * len(events)
+    return run
+
+
+def make_belief_set_bench(num_beliefs, operation):
+    def bench(world, scale):
+        location = Location('warehouse')
+        things = [Item('thing %d' % n, location=location)
+                  for n in range(num_beliefs)]
+        beliefs = BeliefSet()
+        for thing in things:
+            beliefs.add(ItemLocation(thing, location))
+        beliefs.add(Desire(things[0]))
+        repeats = max(1, (20000 * scale) // num_beliefs)
+
+        def add():
+            for n in xrange(repeats):
+                for thing in things:
+                    beliefs.add(ItemLocation(thing, location))
+            return repeats * num_beliefs
+
+        def get():
+            for n in xrange(repeats):
+                for thing in things:
+                    beliefs.get(ItemLocation(thing))
+            return repeats * num_beliefs
+
+        def lookup():
+            for n in xrange(repeats):
+                for thing in things:
+                    beliefs.lookup(ItemLocation, thing)
+            return repeats * num_beliefs
+
+        def beliefs_of_class():
+            # a rare class, so this measures the lookup, not the results
+            lookups = 200 * scale
+            for n in xrange(lookups):
+                for belief in beliefs.beliefs_of_class(Desire):
+                    pass
+            return lookups
+
+        def beliefs_of_subclasses():
+            # Desire is a Goal, so this finds the same belief
+            lookups = 200 * scale
+            for n in xrange(lookups):
+                for belief in beliefs.beliefs_of_class(Goal, subclasses=True):
+                    pass
+            return lookups
+
+        return {'add': add, 'get': get, 'lookup': lookup,
+                'beliefs_of_class': beliefs_of_class,
+                'beliefs_of_subclasses': beliefs_of_subclasses}[operation]
+    return bench
+
+
+TRANSFORMERS = (
+    MadeTheirWayToTransformer, DeduplicateTransformer,
+    AggregateEventsTransformer, DetectWanderingTransformer,
+    UsePronounsTransformer, AddWeatherFrifferyTransformer,
+    AddParagraphStartFrifferyTransformer,
+)
+
+
+def make_transformer_bench(transformer_class):
+    def bench(world, scale):
+        paragraphs = paragraphs_of(world, 2000 * scale)
+        paragraphs = [[clone(e) for e in p] for p in paragraphs]
+        editor = Editor(EventCollector(), (), rng=stream(SEED, 'editor'))
+        transformer = transformer_class()
+
+        def run():
+            count = 0
+            for (n, paragraph) in enumerate(paragraphs):
+                if paragraph:
+                    transformer.transform(editor, paragraph, n + 1)
+                count += len(paragraph)
+            return count
+        return run
+    return bench
+
+
+def bench_editor_publish(world, scale):
+    (characters, collector) = world.simulate(4000 * scale)
+    events = [clone(e) for e in collector.events]
+
+    def run():
+        collector.events = events
+        editor = Editor(collector, characters, sink=MemorySink(),
+                        rng=stream(SEED, 'editor'))
+        for transformer_class in TRANSFORMERS:
+            editor.add_transformer(transformer_class())
+        editor.publish()
+        return len(events)
+    return run
+
+
+def bench_indexed_editor_publish(world, scale):
+    (characters, collector) = world.simulate(4000 * scale)
+    events = list(collector.events)
+
+    def run():
+        # one edition for each character, and one that follows them all,
+        # from the same index
+        index = EventIndex(events)
+        for pov in [characters] + [[c] for c in characters]:
+            editor = IndexedEditor(index, pov, sink=MemorySink(),
+                                   rng=stream(SEED, 'editor'))
+            for transformer_class in TRANSFORMERS:
+                editor.add_transformer(transformer_class())
+            editor.publish()
+        return len(events) * (len(characters) + 1)
+    return run
+
+
+def make_publish_chapter_bench(num_main_characters=None,
+                               level_of_detail=False):
+    def bench(world, scale):
+        def run():
+            (characters, setting) = world.fresh()
+            publisher = Publisher(
+                characters=characters, setting=setting, friffery=True,
+                chapters=1, sink=MemorySink(), seed=SEED,
+                main_characters=characters[:num_main_characters],
+                level_of_detail=level_of_detail,
+            )
+            publisher.publish()
+            return publisher.num_events
+        return run
+    return bench
+
+
+BENCHMARKS = [
+    ('live', 'ticks', bench_live),
+    ('schedule_round_robin', 'events',
+     make_scheduler_bench(RoundRobinScheduler)),
+    ('schedule_priority', 'events', make_scheduler_bench(PriorityScheduler)),
+    ('move_to_crowded', 'moves', bench_move_to_crowded),
+    ('render', 'events', bench_render),
+    ('str_cached', 'events', bench_str_cached),
+    ('load_world', 'worlds', make_load_world_bench(cache=False)),
+    ('load_world_cached', 'worlds', make_load_world_bench(cache=True)),
+    ('snapshot_save', 'snapshots', make_snapshot_bench(restore=False)),
+    ('snapshot_restore', 'snapshots', make_snapshot_bench(restore=True)),
+]
+for num_beliefs in (10, 100, 1000, 10000):
+    for operation in ('add', 'get', 'lookup', 'beliefs_of_class',
+                      'beliefs_of_subclasses'):
+        BENCHMARKS.append((
+            'belief_set_%s_%d' % (operation, num_beliefs),
+            'lookups' if operation.startswith('beliefs_of') else 'beliefs',
+            make_belief_set_bench(num_beliefs, operation)
+        ))
+for transformer_class in TRANSFORMERS:
+    BENCHMARKS.append((
+        'transformer_%s' % transformer_class.__name__, 'events',
+        make_transformer_bench(transformer_class)
+    ))
+BENCHMARKS.append(('editor_publish', 'events', bench_editor_publish))
+BENCHMARKS.append(('indexed_editor_publish', 'events',
+                   bench_indexed_editor_publish))
+BENCHMARKS.append(('publish_chapter', 'events', make_publish_chapter_bench()))
+# following only two of the characters, with and without level of detail.
+# (with it, every event counted is one the Editor could use; without it,
+# most of them are thrown away, so these rates aren't directly comparable.)
+BENCHMARKS.append(('publish_chapter_2_main', 'events',
+                   make_publish_chapter_bench(2)))
+BENCHMARKS.append(('publish_chapter_2_main_lod', 'events',
+                   make_publish_chapter_bench(2, level_of_detail=True)))
+
+
+def time_benchmark(bench, world, scale, repeats):
+    """Return (operations, seconds) of the fastest of several runs, or
+    None if the benchmark doesn't apply to the world.
+
+    """
+    best = None
+    for n in range(repeats):
+        run = bench(world, scale)
+        if run is None:
+            return None
+        start = time.time()
+        operations = run()
+        elapsed = time.time() - start
+        if best is None or elapsed < best[1]:
+            best = (operations, elapsed)
+    return best
+
+
+### MAIN ###
+
+def run(options):
+    scale = 1 if options.quick else 5
+    repeats = 1 if options.quick else 3
+    worlds = [World(name, loader) for (name, loader) in WORLDS
+              if options.world in (None, name)]
+    results = {}
+    for world in worlds:
+        for (name, unit, bench) in BENCHMARKS:
+            if options.only and options.only not in name:
+                continue
+            best = time_benchmark(bench, world, scale, repeats)
+            if best is None:
+                continue
+            (operations, elapsed) = best
+            rate = operations / elapsed if elapsed else float('inf')
+            key = '%s/%s' % (world.name, name)
+            results[key] = {
+                'unit': unit,
+                'operations': operations,
+                'seconds': elapsed,
+                'rate': rate,
+            }
+            print("%-60s %12.1f %s/s" % (key, rate, unit))
+            sys.stdout.flush()
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({
+                'python': platform.python_implementation() + ' ' +
+                          platform.python_version(),
+                'results': results,
+            }, f, indent=4, sort_keys=True)
+            f.write('\n')
+
+
+def compare(options):
+    with open(options.old) as f:
+        old = json.load(f)
+    with open(options.new) as f:
+        new = json.load(f)
+    print("%s -> %s" % (old['python'], new['python']))
+    regressions = 0
+    for key in sorted(set(old['results']) | set(new['results'])):
+        if key not in old['results'] or key not in new['results']:
+            print("%-60s (only in one run)" % key)
+            continue
+        old_rate = old['results'][key]['rate']
+        new_rate = new['results'][key]['rate']
+        change = (new_rate - old_rate) / old_rate
+        flag = ''
+        if change < -options.threshold:
+            flag = '  <-- REGRESSION'
+            regressions += 1
+        print("%-60s %+7.1f%%%s" % (key, change * 100.0, flag))
+    print("%d regression(s)" % regressions)
+    return 1 if regressions else 0
+
+
+def footprint(obj):
+    """Return the number of bytes obj itself takes, counting its __dict__
+    (if it has one), but not the objects it refers to.
+
+    """
+    size = sys.getsizeof(obj)
+    d = getattr(obj, '__dict__', None)
+    if d is not None:
+        size += sys.getsizeof(d)
+    return size
+
+
+def sizes(options):
+    alice = Male('Alice')
+    bob = Male('Bob')
+    location = Location('kitchen')
+    thing = Item('thing')
+    event = Event("<1> saw <2>", [alice, bob])
+    str(event)
+    aggregate = AggregateEvent("%s, then %s", [
+        Event("<1> yawned", [alice]), Event("<1> scratched <his-1> head", [alice])
+    ])
+    str(aggregate)
+    for (name, size) in (
+        ('Event (with its participants)',
+         footprint(event) + footprint(event.participants)),
+        ('AggregateEvent', footprint(aggregate)),
+        ('ItemLocation', footprint(ItemLocation(thing, location))),
+        ('Desire', footprint(Desire(thing))),
+        ('BeliefsBelief (with its BeliefSet)',
+         footprint(BeliefsBelief(bob)) + footprint(BeliefSet())),
+        ('Item', footprint(thing)),
+        ('Location', footprint(location)),
+        ('Male', footprint(alice)),
+    ):
+        print("%-60s %6d bytes" % (name, size))
+
+    # and per event of a simulated chapter, as each kind of collector
+    # keeps them
+    world = World('the_swallows', load_the_swallows)
+    (characters, collector) = world.simulate(20000)
+    size = sum(footprint(e) + footprint(e.participants) + 8
+               for e in collector.events)
+    print("%-60s %6.1f bytes" % ('EventCollector, per event',
+                                  float(size) / len(collector.events)))
+    (characters, collector) = world.simulate(20000, ColumnarEventCollector)
+    print("%-60s %6.1f bytes" % ('ColumnarEventCollector, per event',
+                                  float(collector.bytes_used()) / len(collector)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the engine.')
+    subparsers = parser.add_subparsers()
+
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--world', default=None,
+        choices=[name for (name, loader) in WORLDS])
+    run_parser.add_argument('--only', default=None,
+        help='only run benchmarks whose names contain this')
+    run_parser.add_argument('--quick', action='store_true',
+        help='smaller workloads, and no repeats')
+    run_parser.add_argument('--output', default=None,
+        help='save the results to this JSON file')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+        help='slowdown (as a fraction) to flag as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    sizes_parser = subparsers.add_parser('sizes')
+    sizes_parser.set_defaults(func=sizes)
+
+    options = parser.parse_args(argv)
+    return options.func(options)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+#
+# reedit.py: edit the events of some chapters again, from event logs.
+#
+# Usage: reedit.py [--transformers NAME,NAME,...]
+#                  [--friffery | --no-friffery] [--seed N] EVENT-LOG...
+#
+# The event logs are ones saved by a Publisher with event_log= given.
+# Each one is edited as a chapter, without simulating anything, so this
+# is a quick way to see what some other set of Transformers makes of
+# the same events.  By default, the chapters come out as they did when
+# the logs were saved.
+#
+
+from os.path import realpath, dirname, join
+import argparse
+import sys
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
+
+from swallows.engine import events
+from swallows.engine.events import replay_event_log
+from swallows.engine.seeding import stream
+from swallows.engine.sinks import StreamSink
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Re-edit event logs.')
+    parser.add_argument('logs', nargs='+', metavar='EVENT-LOG')
+    parser.add_argument('--transformers', default=None,
+        help='comma-separated names of the Transformer classes to use, '
+             'in order (default: the ones the Publisher uses)')
+    parser.add_argument('--friffery', action='store_const', const=True,
+        default=None,
+        help='put in the weather and the like (default: only if the '
+             'Publisher that saved each log did)')
+    parser.add_argument('--no-friffery', action='store_const', const=False,
+        dest='friffery', help='leave out the weather and the like')
+    parser.add_argument('--seed', type=int, default=None,
+        help='seed for the Editor\'s random numbers (default: whatever '
+             'they were when each log was saved)')
+    options = parser.parse_args(argv)
+
+    sink = StreamSink()
+    for (number, filename) in enumerate(options.logs):
+        transformers = None
+        if options.transformers is not None:
+            transformers = [getattr(events, name)()
+                            for name in options.transformers.split(',')]
+        rng = None
+        if options.seed is not None:
+            rng = stream(options.seed, 'chapter', number + 1)
+        sink.write("Chapter %d.\n" % (number + 1))
+        sink.write("-----------\n")
+        sink.write("\n")
+        replay_event_log(filename, transformers=transformers,
+                         sink=sink, rng=rng, friffery=options.friffery)
+        sink.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
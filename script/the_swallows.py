@@ -13,16 +13,28 @@ sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
 
 # now we can import things, like:
 from swallows.engine.events import Publisher
-from swallows.story.world import alice, bob, house
+from swallows.engine.seeding import stream
+from swallows.story.world import alice, bob, house, hide_revolver
 
 ### main ###
 
+# give a number on the command line to get the same novel every time
+seed = None
+if len(sys.argv) > 1:
+    seed = int(sys.argv[1])
+    hide_revolver(stream(seed, 'world'))
+else:
+    hide_revolver()
+
 publisher = Publisher(
     characters=(alice, bob),
     setting=house,
     title="Dial S for Swallows",
     friffery=True,
+    seed=seed,
     #debug=True,
     #chapters=1,
+    #event_log='chapter-%(chapter)02d.events',
+    #checkpoint='the_swallows.checkpoint',
 )
 publisher.publish()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+#
+# the_swallows_batch.py: a whole shelf of novels, generated at once.
+#
+# Usage: the_swallows_batch.py [options] NUMBER-OF-NOVELS
+#
+# Each novel gets its own seed, title and output file, and the novels are
+# spread over a pool of worker processes.  Each novel starts from its own
+# copy of the world, loaded from its definition (which is only actually
+# built once, and kept in memory.)  A manifest (in JSON) records how each
+# one went, and is brought up to date as each one is finished.
+#
+# With --checkpoints, a snapshot of each novel is saved beside it after
+# each chapter; if the batch is stopped, run it again, with the same seed
+# and --resume, and each novel carries on from its last chapter.
+#
+
+from os.path import realpath, dirname, getsize, join
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
+
+from swallows.engine.events import Publisher
+from swallows.engine.seeding import derive_seed, stream
+from swallows.engine.sinks import FileSink, GzipSink
+from swallows.story.loader import load_world
+from swallows.story.world import HOUSE
+
+
+def publish_novel(job):
+    (number, seed, title, filename, compress, options) = job
+    world = load_world(HOUSE, rng=stream(seed, 'world'))
+    if compress:
+        sink = GzipSink(filename, resuming=options.resume)
+    else:
+        sink = FileSink(filename, resuming=options.resume)
+    checkpoint = None
+    if options.checkpoints:
+        checkpoint = filename + '.checkpoint'
+    publisher = Publisher(
+        characters=(world.alice, world.bob),
+        setting=world.setting,
+        title=title,
+        friffery=True,
+        seed=seed,
+        sink=sink,
+        chapters=options.chapters,
+        events_per_chapter=options.events_per_chapter,
+        checkpoint=checkpoint,
+    )
+
+    start = time.time()
+    publisher.publish(resume=options.resume)
+    publisher.sink.close()
+    elapsed = time.time() - start
+
+    return {
+        'number': number,
+        'seed': seed,
+        'title': title,
+        'output': filename,
+        'elapsed': elapsed,
+        'words': publisher.sink.words_written,
+        'characters': publisher.sink.chars_written,
+        'file_size': getsize(filename),
+        'events': publisher.num_events,
+        'events_per_second': publisher.num_events / elapsed if elapsed else None,
+    }
+
+
+def write_manifest(options, master_seed, elapsed, novels, complete):
+    # written under another name and then renamed, so that there's never
+    # a half-written manifest
+    temporary = '%s.%d' % (options.manifest, os.getpid())
+    with open(temporary, 'w') as f:
+        json.dump({
+            'seed': master_seed,
+            'workers': options.workers or multiprocessing.cpu_count(),
+            'elapsed': elapsed,
+            'complete': complete,
+            'novels': novels,
+        }, f, indent=4, sort_keys=True)
+        f.write('\n')
+    if os.name == 'nt' and os.path.exists(options.manifest):
+        os.remove(options.manifest)
+    os.rename(temporary, options.manifest)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Generate many novels.')
+    parser.add_argument('novels', type=int, metavar='NUMBER-OF-NOVELS')
+    parser.add_argument('--seed', type=int, default=None,
+        help='master seed; each novel\'s seed is derived from it '
+             '(default: pick one at random)')
+    parser.add_argument('--workers', type=int, default=None,
+        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--title', default='Dial S for Swallows, Volume %(number)d',
+        help='title of each novel; may refer to %%(number)d and %%(seed)d')
+    parser.add_argument('--output', default='novel-%(number)04d.markdown',
+        help='output file of each novel; may refer to %%(number)d and %%(seed)d')
+    parser.add_argument('--gzip', action='store_true',
+        help='compress each novel with gzip')
+    parser.add_argument('--manifest', default='manifest.json',
+        help='where to write the manifest')
+    parser.add_argument('--checkpoints', action='store_true',
+        help='save a checkpoint of each novel after each chapter')
+    parser.add_argument('--resume', action='store_true',
+        help='carry on from the checkpoints of an earlier run '
+             '(which needs --seed)')
+    parser.add_argument('--chapters', type=int, default=18)
+    parser.add_argument('--events-per-chapter', type=int, default=810)
+    options = parser.parse_args(argv)
+    if options.resume:
+        if options.seed is None:
+            parser.error('--resume needs the --seed of the run to resume')
+        options.checkpoints = True
+
+    master_seed = options.seed
+    if master_seed is None:
+        master_seed = random.getrandbits(32)
+
+    jobs = []
+    for number in range(1, options.novels + 1):
+        seed = derive_seed(master_seed, 'novel', number)
+        names = {'number': number, 'seed': seed}
+        filename = options.output % names
+        if options.gzip and not filename.endswith('.gz'):
+            filename += '.gz'
+        jobs.append((number, seed, options.title % names,
+                     filename, options.gzip, options))
+
+    start = time.time()
+    pool = multiprocessing.Pool(options.workers)
+    novels = []
+    # the manifest is written again as each novel is finished, so if one
+    # of them fails (or we're stopped), it still says how the finished
+    # ones went; "complete" says whether they all were
+    try:
+        for novel in pool.imap(publish_novel, jobs):
+            sys.stderr.write("%(output)s: %(words)d words, %(elapsed).2fs\n"
+                             % novel)
+            novels.append(novel)
+            write_manifest(options, master_seed, time.time() - start,
+                           novels, complete=False)
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+    write_manifest(options, master_seed, time.time() - start, novels,
+                   complete=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+#
+# the_swallows_editions.py: the same novel, told several ways at once.
+#
+# Usage: the_swallows_editions.py [options]
+#
+# The story is simulated only once, and edited into several editions:
+# the usual one, which follows Alice and Bob in turn, and one that follows
+# only Alice, and one that follows only Bob.  Each goes in its own file.
+#
+
+from os.path import realpath, dirname, join
+import argparse
+import sys
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(sys.argv[0])), '..', 'src'))
+
+from swallows.engine.events import Publisher, Edition
+from swallows.engine.seeding import stream
+from swallows.engine.sinks import FileSink
+from swallows.story.world import alice, bob, house, hide_revolver
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Generate several editions of one novel.')
+    parser.add_argument('--seed', type=int, default=None,
+        help='give a number to get the same novels every time')
+    parser.add_argument('--output', default='edition-%(name)s.markdown',
+        help='output file of each edition; may refer to %%(name)s')
+    parser.add_argument('--chapters', type=int, default=18)
+    options = parser.parse_args(argv)
+
+    if options.seed is not None:
+        hide_revolver(stream(options.seed, 'world'))
+    else:
+        hide_revolver()
+
+    editions = []
+    for (name, title, main_characters) in (
+        ('both', "Dial S for Swallows", None),
+        ('alice', "Dial S for Swallows: Alice's Story", [alice]),
+        ('bob', "Dial S for Swallows: Bob's Story", [bob]),
+    ):
+        editions.append(Edition(
+            FileSink(options.output % {'name': name}),
+            title=title,
+            main_characters=main_characters,
+        ))
+
+    publisher = Publisher(
+        characters=(alice, bob),
+        setting=house,
+        friffery=True,
+        seed=options.seed,
+        chapters=options.chapters,
+        editions=editions,
+    )
+    publisher.publish()
+    for edition in editions:
+        edition.sink.close()
+        sys.stderr.write("%s: %s\n" % (edition.sink.filename, edition.sink))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,5 +1,19 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from io import BytesIO
+import mmap
+import multiprocessing
+import os
 import random
-import sys
+import re
+import struct
+try:
+    xrange
+except NameError:  # Python 3
+    xrange = range
+
+from swallows.engine.scheduling import SchedulerStats, RoundRobinScheduler
 
 # TODO
 
@@ -11,9 +25,189 @@ import sys
 #   i.e. chapter summaries -- that's a little too fancy to hope for, but with
 #   a sufficiently smart Editor it could be done
 
+### PHRASE TEMPLATES ###
+
+# a phrase like "<1> gave <3> to <2>" is parsed, once, into a list of
+# tokens.  each token is either a literal string, or a tuple
+# (slot, form, text) which refers to participants[slot], rendered in the
+# given form.  text is the original placeholder, used if the event does
+# not actually have that many participants.
+
+PLACEHOLDER = re.compile(r'<(|indef-|his-|him-|he-|was-|is-)([1-9]\d*)>')
+
+# (these are functions of the module, not lambdas, so that the tokens
+# can be pickled)
+
+def form_name(actor, event):
+    return actor.render(event)
+
+
+def form_indefinite(actor, event):
+    return actor.indefinite()
+
+
+def form_posessive(actor, event):
+    return actor.posessive()
+
+
+def form_accusative(actor, event):
+    return actor.accusative()
+
+
+def form_pronoun(actor, event):
+    return actor.pronoun()
+
+
+def form_was(actor, event):
+    return actor.was()
+
+
+def form_is(actor, event):
+    return actor.is_()
+
+
+FORMS = {
+    '':       form_name,
+    'indef-': form_indefinite,
+    'his-':   form_posessive,
+    'him-':   form_accusative,
+    'he-':    form_pronoun,
+    'was-':   form_was,
+    'is-':    form_is,
+}
+
+_templates = {}
+
+
+def compile_phrase(phrase):
+    """Return the (cached) list of tokens for the given phrase."""
+    tokens = _templates.get(phrase)
+    if tokens is None:
+        tokens = []
+        pos = 0
+        for match in PLACEHOLDER.finditer(phrase):
+            if match.start() > pos:
+                tokens.append(phrase[pos:match.start()])
+            tokens.append((int(match.group(2)) - 1, FORMS[match.group(1)],
+                           match.group(0)))
+            pos = match.end()
+        if pos < len(phrase):
+            tokens.append(phrase[pos:])
+        _templates[phrase] = tokens
+    return tokens
+
+
+### PHRASE CATALOG ###
+
+# every phrase an event is made with has a PhraseKind in the catalog, so
+# that the Editor and its Transformers can tell what sort of event it is
+# by looking at a few flags, or comparing kinds by identity, instead of
+# searching the phrase (or worse, the rendered sentence) for words.
+#
+# phrases that Transformers derive from other phrases -- ones that have
+# been given pronouns, or ", twice" -- know the kind they were derived
+# from (their base) and how many times the event is being said to have
+# happened (repeats).
+
+DIALOGUE = 1     # a line of dialogue: "'Hello, Bob,' said Alice"
+MOVEMENT = 2     # someone going somewhere: "Bob went to the kitchen"
+ARRIVAL = 4      # someone turning up in the story: "Bob was in the kitchen"
+LOCATING = 8     # saying where something is: "... was in ..."
+DISCOVERY = 16   # something exciting, found offstage: "... had found ..."
+
+REPEATS_SUFFIXES = ((', several times', 3), (', twice', 2))
+LOCATING_PHRASE = re.compile(r'<was-[1-9]\d*> in ')
+
+
+class PhraseKind(object):
+    __slots__ = ('id', 'phrase', 'tokens', 'flags', 'base', 'repeats')
+
+    def __init__(self, id, phrase, flags, base, repeats):
+        self.id = id
+        self.phrase = phrase
+        self.tokens = compile_phrase(phrase)
+        self.flags = flags
+        self.base = base
+        self.repeats = repeats
+
+    def __repr__(self):
+        return 'PhraseKind(%d, %r)' % (self.id, self.phrase)
+
+    def __reduce__(self):
+        # a kind is unpickled as the kind of its phrase in this process's
+        # catalog, so that kinds can still be compared by identity
+        return (phrase_kind, (self.phrase,))
+
+
+class PhraseCatalog(object):
+    def __init__(self):
+        self.kinds = []
+        self.kind_of_phrase = {}
+
+    def kind(self, phrase):
+        """Return the PhraseKind of the given phrase, adding it to the
+        catalog if it isn't already in it.
+
+        """
+        kind = self.kind_of_phrase.get(phrase)
+        if kind is None:
+            kind = self.add(phrase)
+        return kind
+
+    def add(self, phrase):
+        base = None
+        repeats = 1
+        for (suffix, times) in REPEATS_SUFFIXES:
+            if phrase.endswith(suffix):
+                base = self.kind(phrase[:-len(suffix)])
+                repeats = times
+                break
+        if base is None and '<he-1>' in phrase:
+            base = self.kind(phrase.replace('<he-1>', '<1>'))
+        flags = 0
+        if phrase.startswith("'"):
+            flags |= DIALOGUE
+        if 'went to' in phrase or 'made <his-1> way to' in phrase:
+            flags |= MOVEMENT
+        if phrase == '<1> <was-1> in <2>':
+            flags |= ARRIVAL
+        if LOCATING_PHRASE.search(phrase):
+            flags |= LOCATING
+        if ' had found ' in phrase:
+            flags |= DISCOVERY
+        kind = PhraseKind(len(self.kinds), phrase, flags, base, repeats)
+        self.kinds.append(kind)
+        self.kind_of_phrase[phrase] = kind
+        return kind
+
+
+catalog = PhraseCatalog()
+
+
+def phrase_kind(phrase):
+    """Return the PhraseKind of the given phrase in the catalog."""
+    return catalog.kind(phrase)
+
+
+# the kinds the engine itself looks out for.  these are added first, so
+# they always have the same ids.
+WENT_TO = catalog.kind('<1> went to <2>')
+MADE_WAY_TO = catalog.kind('<1> made <his-1> way to <2>')
+WAS_IN = catalog.kind('<1> <was-1> in <2>')
+SAW = catalog.kind('<1> saw <2>')
+HAD_FOUND = catalog.kind('<1> had found <2> in <3>')
+WANDERED = catalog.kind('<1> wandered around for a bit, then came back to <2>')
+
+
 ### EVENTS ###
 
 class Event(object):
+    __slots__ = (
+        '_container', '_phrase', 'kind', '_participants', '_excl',
+        '_rendered', '_str', 'location', '_previous_location', 'speaker',
+        'addressed_to', 'exciting',
+    )
+
     def __init__(self, phrase, participants, excl=False,
                  previous_location=None,
                  speaker=None,
@@ -38,6 +232,7 @@ class Event(object):
         If addressed_to == None, it means the reader is being spoken to.
 
         """
+        self._container = None
         self.phrase = phrase
         self.participants = participants
         self.location = participants[0].location
@@ -47,37 +242,122 @@ class Event(object):
         self.addressed_to = addressed_to
         self.exciting = exciting
 
+    # the rendered text of the event is cached, and thrown away whenever
+    # the phrase, participants or excl-ness of the event are changed (as
+    # the Transformers are wont to do.)
+
+    def _get_phrase(self):
+        return self._phrase
+
+    def _set_phrase(self, phrase):
+        self._phrase = phrase
+        # the PhraseKind of the phrase, which says what sort of event it is
+        kind = catalog.kind_of_phrase.get(phrase)
+        if kind is None:
+            kind = catalog.add(phrase)
+        self.kind = kind
+        self.invalidate()
+
+    phrase = property(_get_phrase, _set_phrase)
+
+    def _get_participants(self):
+        return self._participants
+
+    def _set_participants(self, participants):
+        self._participants = Participants(self, participants)
+        self.invalidate()
+
+    participants = property(_get_participants, _set_participants)
+
+    def _get_excl(self):
+        return self._excl
+
+    def _set_excl(self, excl):
+        self._excl = excl
+        self.invalidate()
+
+    excl = property(_get_excl, _set_excl)
+
+    def invalidate(self):
+        self._rendered = None
+        self._str = None
+        if self._container is not None:
+            self._container.invalidate()
+
     def rephrase(self, new_phrase):
         """Does not modify the event.  Returns a new copy."""
         return Event(new_phrase, self.participants, excl=self.excl)
 
+    def copy(self):
+        """Return a copy of the event, which can be changed (by a
+        Transformer, say) without changing this one.
+
+        """
+        event = Event(self.phrase, list(self.participants), excl=self.excl,
+                      previous_location=self._previous_location,
+                      speaker=self.speaker, addressed_to=self.addressed_to,
+                      exciting=self.exciting)
+        event.location = self.location
+        # it renders the same, too, until it is changed
+        event._rendered = self._rendered
+        event._str = self._str
+        return event
+
     def initiator(self):
         return self.participants[0]
 
     def previous_location(self):
         return self._previous_location
 
+    # the Participants refer back to the event, so they are pickled as a
+    # plain list, and made into Participants again once the event exists
+
+    def __getstate__(self):
+        state = {}
+        for name in slot_names(self.__class__):
+            if hasattr(self, name):
+                state[name] = getattr(self, name)
+        if '_participants' in state:
+            state['_participants'] = list(state['_participants'])
+        return state
+
+    def __setstate__(self, state):
+        for (name, value) in state.items():
+            if name == '_participants':
+                value = Participants(self, value)
+            setattr(self, name, value)
+
     def render(self):
-        phrase = self.phrase
-        i = 0
-        for participant in self.participants:
-            phrase = phrase.replace('<%d>' % (i + 1), participant.render(event=self))
-            phrase = phrase.replace('<indef-%d>' % (i + 1), participant.indefinite())
-            phrase = phrase.replace('<his-%d>' % (i + 1), participant.posessive())
-            phrase = phrase.replace('<him-%d>' % (i + 1), participant.accusative())
-            phrase = phrase.replace('<he-%d>' % (i + 1), participant.pronoun())
-            phrase = phrase.replace('<was-%d>' % (i + 1), participant.was())
-            phrase = phrase.replace('<is-%d>' % (i + 1), participant.is_())
-            i = i + 1
-        return phrase
+        if self._rendered is not None:
+            render_stats.hits += 1
+            return self._rendered
+        render_stats.misses += 1
+        participants = self.participants
+        num_participants = len(participants)
+        parts = []
+        for token in self.kind.tokens:
+            if token.__class__ is tuple:
+                (slot, form, text) = token
+                if slot < num_participants:
+                    token = form(participants[slot], self)
+                else:
+                    token = text
+            parts.append(token)
+        self._rendered = ''.join(parts)
+        return self._rendered
 
     def __str__(self):
+        if self._str is not None:
+            str_stats.hits += 1
+            return self._str
+        str_stats.misses += 1
         phrase = self.render()
         if self.excl:
             phrase = phrase + '!'
         else:
             phrase = phrase + '.'
-        return phrase[0].upper() + phrase[1:]
+        self._str = phrase[0].upper() + phrase[1:]
+        return self._str
 
 
 class AggregateEvent(Event):
@@ -87,7 +367,10 @@ class AggregateEvent(Event):
     This is definitely not as nice as it could be.
 
     """
+    __slots__ = ('template', 'events', '_initiator')
+
     def __init__(self, template, events, excl=False):
+        self._container = None
         self.template = template
         self.events = events
         self.excl = excl
@@ -95,6 +378,8 @@ class AggregateEvent(Event):
         self._initiator = self.events[0].initiator()
         for event in self.events:
             assert event.initiator() == self._initiator
+            # so that changes to the constituent events reach us
+            event._container = self
         self.location = self._initiator.location
 
     def rephrase(self, new_phrase):
@@ -107,26 +392,531 @@ class AggregateEvent(Event):
     def previous_location(self):
         return self.events[0].previous_location()
 
+    def render(self):
+        if self._rendered is not None:
+            render_stats.hits += 1
+            return self._rendered
+        render_stats.misses += 1
+        self._rendered = self.template % tuple([x.render() for x in self.events])
+        return self._rendered
+
+
+class Participants(list):
+    """The list of participants of an Event.  Changing it in place
+    invalidates the event's cached rendering.
+
+    """
+    __slots__ = ('event',)
+
+    def __init__(self, event, participants):
+        list.__init__(self, participants)
+        self.event = event
+
+    def __setitem__(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.__setitem__(self, *args, **kwargs)
+
+    def __delitem__(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.__delitem__(self, *args, **kwargs)
+
+    def __setslice__(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.__setslice__(self, *args, **kwargs)
+
+    def __delslice__(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.__delslice__(self, *args, **kwargs)
+
+    def __iadd__(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.__iadd__(self, *args, **kwargs)
+
+    def __imul__(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.__imul__(self, *args, **kwargs)
+
+    def append(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.append(self, *args, **kwargs)
+
+    def extend(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.extend(self, *args, **kwargs)
+
+    def clear(self, *args, **kwargs):
+        # (only lists under Python 3 have this one)
+        self.event.invalidate()
+        return list.clear(self, *args, **kwargs)
+
+    def insert(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.insert(self, *args, **kwargs)
+
+    def pop(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.pop(self, *args, **kwargs)
+
+    def remove(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.remove(self, *args, **kwargs)
+
+    def reverse(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.reverse(self, *args, **kwargs)
+
+    def sort(self, *args, **kwargs):
+        self.event.invalidate()
+        return list.sort(self, *args, **kwargs)
+
+    def __reduce__(self):
+        # on its own, it comes back as a plain list; an Event pickles its
+        # participants that way anyway, and wraps them again itself
+        return (list, (list(self),))
+
+
+class CacheStats(object):
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
     def __str__(self):
-        phrase = self.template % tuple([x.render() for x in self.events])
-        if self.excl:
-            phrase = phrase + '!'
-        else:
-            phrase = phrase + '.'
-        return phrase[0].upper() + phrase[1:]
+        total = self.hits + self.misses
+        return "%s: %d hits, %d misses (%.1f%% hit rate)" % (
+            self.name, self.hits, self.misses,
+            (100.0 * self.hits / total) if total else 0.0
+        )
+
+
+# how often Event.render and str(Event) were answered from the cache
+render_stats = CacheStats('render')
+str_stats = CacheStats('str')
 
 
 class EventCollector(object):
     def __init__(self):
         self.events = []
+        self.last_event = None
+        self.num_collected = 0
     
-    def collect(self, event):
-        if self.events and str(event) == str(self.events[-1]):
+    def check(self, event):
+        if self.last_event is not None and str(event) == str(self.last_event):
             raise ValueError('Duplicate event: %s' % event)
-        if event.phrase == '<1> went to <2>':
+        if event.kind is WENT_TO:
             assert event.previous_location() is not None
             assert event.previous_location() != event.location
+
+    def collect(self, event):
+        self.check(event)
         self.events.append(event)
+        self.last_event = event
+        self.num_collected += 1
+
+    def end_turn(self):
+        """Let the next event be the same as the last one.  A Scheduler
+        that may give a character two turns in a row calls this between
+        them, so that only an event repeated within one turn counts as a
+        duplicate.
+
+        """
+        self.last_event = None
+
+    def truncate(self, num_events):
+        """Forget all but the first num_events events.  Return how many
+        were forgotten.
+
+        """
+        excess = max(0, len(self.events) - num_events)
+        if excess:
+            del self.events[num_events:]
+            self.last_event = self.events[-1] if self.events else None
+            self.num_collected -= excess
+        return excess
+
+    def stream(self):
+        """Return an iterator over the collected events, in the order
+        they happened.  This is what the Editor reads from.
+
+        """
+        return iter(self.events)
+
+
+class StreamingEventCollector(EventCollector):
+    """An EventCollector that doesn't hold on to the whole chapter.
+
+    Instead, stream() runs the simulation (by stepping the given
+    Scheduler, or a RoundRobinScheduler) only as far as it needs to in
+    order to have more events to hand to the Editor, and forgets each
+    event once it has handed it over.  So self.events only ever holds
+    the events of the current round of turns.
+
+    """
+    def __init__(self, characters, num_events, scheduler=None):
+        EventCollector.__init__(self)
+        self.events = deque()
+        self.characters = characters
+        self.num_events = num_events
+        if scheduler is None:
+            scheduler = RoundRobinScheduler(characters)
+        self.scheduler = scheduler
+
+    def stream(self):
+        num_streamed = 0
+        while True:
+            while self.events:
+                if self.scheduler.exact and num_streamed >= self.num_events:
+                    # drop what the last turn made beyond the budget (but
+                    # not what it did; see Scheduler.exact)
+                    self.scheduler.stats.trimmed += len(self.events)
+                    self.num_collected -= len(self.events)
+                    self.events.clear()
+                    return
+                num_streamed += 1
+                yield self.events.popleft()
+            if self.num_collected >= self.num_events:
+                return
+            self.scheduler.step()
+
+
+class ColumnarEventCollector(EventCollector):
+    """An EventCollector that doesn't keep Event objects around.
+
+    Instead, each event is taken apart into small integers, which are
+    appended to arrays, one array per column: the phrase, the location,
+    the previous location, the speaker, who it was addressed to, and
+    flags.  Phrases and actors are numbered, in the order they are first
+    seen, in the phrases and actors tables.  The participants of all the
+    events go in one long array; participant_offsets[n] is where the
+    participants of event n start (and participant_offsets[n+1] is where
+    they end.)  Actors that aren't there (like the speaker, usually) are
+    numbered -1.
+
+    Reading an event (by indexing, iterating, or stream()) builds a new
+    Event from the columns; changing that Event doesn't change what was
+    collected.  self.events is the collector itself, so len() of it, and
+    looping over it, work as they would for an EventCollector.
+
+    """
+    EXCL = 1
+    EXCITING = 2
+
+    def __init__(self):
+        self.last_event = None
+        self.num_collected = 0
+        self.actors = []
+        self.actor_ids = {}
+        self.phrases = []
+        self.phrase_ids = {}
+        self.phrase_column = array('i')
+        self.participant_column = array('i')
+        self.participant_offsets = array('i', [0])
+        self.location_column = array('i')
+        self.previous_location_column = array('i')
+        self.speaker_column = array('i')
+        self.addressed_to_column = array('i')
+        self.flags_column = array('B')
+
+    @property
+    def events(self):
+        return self
+
+    def actor_id(self, actor):
+        if actor is None:
+            return -1
+        n = self.actor_ids.get(actor)
+        if n is None:
+            n = self.actor_ids[actor] = len(self.actors)
+            self.actors.append(actor)
+        return n
+
+    def phrase_id(self, phrase):
+        n = self.phrase_ids.get(phrase)
+        if n is None:
+            n = self.phrase_ids[phrase] = len(self.phrases)
+            self.phrases.append(phrase)
+        return n
+
+    def actor(self, n):
+        if n < 0:
+            return None
+        return self.actors[n]
+
+    def collect(self, event):
+        self.check(event)
+        self.store(event)
+        self.last_event = event
+        self.num_collected += 1
+
+    def store(self, event):
+        """Append the event to the columns (without checking it.)"""
+        actor_id = self.actor_id
+        self.phrase_column.append(self.phrase_id(event.phrase))
+        self.participant_column.extend(
+            [actor_id(p) for p in event.participants]
+        )
+        self.participant_offsets.append(len(self.participant_column))
+        self.location_column.append(actor_id(event.location))
+        self.previous_location_column.append(
+            actor_id(event.previous_location())
+        )
+        self.speaker_column.append(actor_id(event.speaker))
+        self.addressed_to_column.append(actor_id(event.addressed_to))
+        self.flags_column.append(
+            (self.EXCL if event.excl else 0) |
+            (self.EXCITING if event.exciting else 0)
+        )
+
+    def truncate(self, num_events):
+        excess = max(0, len(self) - num_events)
+        if excess:
+            end = self.participant_offsets[num_events]
+            del self.participant_column[end:]
+            del self.participant_offsets[num_events + 1:]
+            for column in (self.phrase_column, self.location_column,
+                           self.previous_location_column, self.speaker_column,
+                           self.addressed_to_column, self.flags_column):
+                del column[num_events:]
+            self.last_event = self[-1] if len(self) else None
+            self.num_collected -= excess
+        return excess
+
+    def __len__(self):
+        return len(self.phrase_column)
+
+    def __nonzero__(self):
+        # even when empty, since emit() only collects if the collector is true
+        return True
+
+    __bool__ = __nonzero__
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self)
+        actor = self.actor
+        start = self.participant_offsets[n]
+        end = self.participant_offsets[n + 1]
+        flags = self.flags_column[n]
+        event = Event(
+            self.phrases[self.phrase_column[n]],
+            [actor(p) for p in self.participant_column[start:end]],
+            excl=bool(flags & self.EXCL),
+            previous_location=actor(self.previous_location_column[n]),
+            speaker=actor(self.speaker_column[n]),
+            addressed_to=actor(self.addressed_to_column[n]),
+            exciting=bool(flags & self.EXCITING),
+        )
+        # where it happened, not where the initiator is now
+        event.location = actor(self.location_column[n])
+        return event
+
+    def __iter__(self):
+        for n in xrange(len(self)):
+            yield self[n]
+
+    def stream(self):
+        return iter(self)
+
+    def phrase_counts(self):
+        """Return a dict mapping each phrase to how many times it was
+        collected, without building any Events.
+
+        """
+        counts = [0] * len(self.phrases)
+        for n in self.phrase_column:
+            counts[n] += 1
+        return dict(zip(self.phrases, counts))
+
+    def bytes_used(self):
+        """Return how many bytes the columns take (not counting the
+        phrases and actors tables.)
+
+        """
+        return sum(column.buffer_info()[1] * column.itemsize for column in (
+            self.phrase_column, self.participant_column,
+            self.participant_offsets, self.location_column,
+            self.previous_location_column, self.speaker_column,
+            self.addressed_to_column, self.flags_column,
+        ))
+
+
+### EVENT LOGS ###
+
+# an event log is a file holding the events of a chapter, so that they can
+# be edited again (with different Transformers, say) without simulating
+# them again.  it looks like this:
+#
+#   EVENT_LOG_MAGIC
+#   the length of the table, as a little-endian unsigned 32-bit int
+#   the table: a snapshot (see swallows.engine.snapshots) of a dict
+#     holding the actors, the phrases, which actors are the main
+#     characters, how many events there are, the state of the Editor's
+#     random numbers when it started on them, and whether the Publisher
+#     that saved them had friffery
+#   the events, each an EVENT_RECORD (phrase, location, previous location,
+#     speaker, addressed_to, flags, and the number of participants)
+#     followed by that many participants, each a 32-bit int
+#
+# like in a ColumnarEventCollector, phrases and actors are numbered, and
+# an actor that isn't there is -1.
+#
+# only as much of each actor is saved as it takes to render it, and to
+# tell where it was: not its contents, or its exits, or its beliefs, which
+# would drag the whole world in with it.  (where it was may still bring
+# in a few more actors, like the room its container is in.)
+
+EVENT_LOG_MAGIC = b'SWALLOWS-EVENTS\x02'
+EVENT_LOG_HEADER = struct.Struct('<I')
+EVENT_RECORD = struct.Struct('<iiiiiBB')
+LOGGED_ACTOR_ATTRIBUTES = ('_name', '_owner', 'renderings', 'enter', 'noun_',
+                           'location')
+
+
+def logged_state_of(actor):
+    state = {}
+    for name in LOGGED_ACTOR_ATTRIBUTES:
+        try:
+            state[name] = getattr(actor, name)
+        except AttributeError:
+            pass
+    return state
+
+
+def dump_table(table, f):
+    dump_snapshot(table, f, state=logged_state_of)
+
+
+def load_table(data):
+    return load_snapshot(BytesIO(data))
+
+
+def save_event_log(events, filename, main_characters=(), rng=None,
+                   friffery=False):
+    """Write the given events (an EventCollector, or any iterable of
+    Events) to an event log file.  If rng is given, a replay will start
+    the Editor with its random numbers in the same state as rng is now.
+    friffery is what a replay uses, by default, to pick its Transformers.
+
+    """
+    columns = events
+    if not isinstance(columns, ColumnarEventCollector):
+        if isinstance(events, EventCollector):
+            events = events.events
+        columns = ColumnarEventCollector()
+        for event in events:
+            columns.store(event)
+    table = {
+        'actors': columns.actors,
+        'phrases': columns.phrases,
+        'main_characters': [columns.actor_id(c) for c in main_characters],
+        'count': len(columns),
+        'random_state': rng.getstate() if rng is not None else None,
+        'friffery': friffery,
+    }
+    # written under another name and then renamed, so that a log that
+    # couldn't be saved is never left lying around half-written
+    temporary = '%s.%d' % (filename, os.getpid())
+    try:
+        write_event_log(columns, table, temporary)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    if os.name == 'nt' and os.path.exists(filename):
+        os.remove(filename)
+    os.rename(temporary, filename)
+
+
+def write_event_log(columns, table, filename):
+    with open(filename, 'wb') as f:
+        f.write(EVENT_LOG_MAGIC)
+        f.write(EVENT_LOG_HEADER.pack(0))
+        start = f.tell()
+        dump_table(table, f)
+        length = f.tell() - start
+        f.seek(start - EVENT_LOG_HEADER.size)
+        f.write(EVENT_LOG_HEADER.pack(length))
+        f.seek(start + length)
+        for n in xrange(len(columns)):
+            start = columns.participant_offsets[n]
+            end = columns.participant_offsets[n + 1]
+            f.write(EVENT_RECORD.pack(
+                columns.phrase_column[n],
+                columns.location_column[n],
+                columns.previous_location_column[n],
+                columns.speaker_column[n],
+                columns.addressed_to_column[n],
+                columns.flags_column[n],
+                end - start,
+            ))
+            f.write(struct.pack(
+                '<%di' % (end - start), *columns.participant_column[start:end]
+            ))
+
+
+class EventLog(object):
+    """The events in an event log file, which can be handed to an Editor
+    as if this were an EventCollector.  The file is memory-mapped, and
+    each event is only read (and an Event built for it) when stream()
+    gets to it.
+
+    """
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(EVENT_LOG_MAGIC)] != EVENT_LOG_MAGIC:
+            raise ValueError('%s is not an event log' % filename)
+        offset = len(EVENT_LOG_MAGIC)
+        (length,) = EVENT_LOG_HEADER.unpack_from(self.map, offset)
+        offset += EVENT_LOG_HEADER.size
+        table = load_table(self.map[offset:offset + length])
+        self.events_offset = offset + length
+        self.actors = table['actors']
+        self.phrases = table['phrases']
+        self.main_characters = [self.actors[n]
+                                for n in table['main_characters']]
+        self.num_events = table['count']
+        self.random_state = table['random_state']
+        # logs saved before this was recorded were replayed with friffery
+        self.friffery = table.get('friffery', True)
+
+    def __len__(self):
+        return self.num_events
+
+    def actor(self, n):
+        if n < 0:
+            return None
+        return self.actors[n]
+
+    def stream(self):
+        actor = self.actor
+        data = self.map
+        offset = self.events_offset
+        for n in xrange(self.num_events):
+            (phrase, location, previous_location, speaker, addressed_to,
+             flags, num_participants) = EVENT_RECORD.unpack_from(data, offset)
+            offset += EVENT_RECORD.size
+            participants = [actor(p) for p in struct.unpack_from(
+                '<%di' % num_participants, data, offset
+            )]
+            offset += 4 * num_participants
+            event = Event(
+                self.phrases[phrase], participants,
+                excl=bool(flags & ColumnarEventCollector.EXCL),
+                previous_location=actor(previous_location),
+                speaker=actor(speaker),
+                addressed_to=actor(addressed_to),
+                exciting=bool(flags & ColumnarEventCollector.EXCITING),
+            )
+            event.location = actor(location)
+            yield event
+
+    def close(self):
+        self.map.close()
+        self.file.close()
 
 
 # not really needed, as emit() does nothing if there is no collector
@@ -166,8 +956,16 @@ class Editor(object):
 
     """
  
-    def __init__(self, collector, main_characters):
-        self.events = list(reversed(collector.events))
+    def __init__(self, collector, main_characters, sink=None, rng=None):
+        self.events = collector.stream()
+        if sink is None:
+            sink = StreamSink()
+        self.sink = sink
+        # where the Editor, and its Transformers, get random numbers from
+        if rng is None:
+            rng = random
+        self.random = rng
+        self.lookahead = None
         self.main_characters = main_characters
         self.pov_index = 0
         self.transformers = []
@@ -181,16 +979,27 @@ class Editor(object):
     def add_transformer(self, transformer):
         self.transformers.append(transformer)
 
+    def more_events(self):
+        if self.lookahead is None:
+            self.lookahead = next(self.events, None)
+        return self.lookahead is not None
+
+    def next_event(self):
+        self.more_events()
+        event = self.lookahead
+        self.lookahead = None
+        return event
+
     def publish(self):
+        pipeline = Pipeline(self.transformers)
         paragraph_num = 1
-        while len(self.events) > 0:
+        while self.more_events():
             pov_actor = self.main_characters[self.pov_index]
-            paragraph_events = self.generate_paragraph_events(pov_actor)
-            for transformer in self.transformers:
-                if paragraph_events:
-                    paragraph_events = transformer.transform(
-                        self, paragraph_events, paragraph_num
-                    )
+            paragraph_events = []
+            pipeline.begin(self, paragraph_num, paragraph_events.append)
+            for event in self.generate_paragraph_events(pov_actor):
+                pipeline.feed(event)
+            pipeline.flush()
             self.publish_paragraph(paragraph_events)
             self.pov_index += 1
             if self.pov_index >= len(self.main_characters):
@@ -198,29 +1007,30 @@ class Editor(object):
             paragraph_num += 1
 
     def generate_paragraph_events(self, pov_actor):
-        quota = random.randint(10, 25)
+        quota = self.random.randint(10, 25)
         paragraph_events = []
-        while len(paragraph_events) < quota and len(self.events) > 0:
-            event = self.events.pop()
+        while len(paragraph_events) < quota and self.more_events():
+            event = self.next_event()
 
             if not paragraph_events:
                 # this is the first sentence of the paragraph
                 # if the reader wasn't aware they were here, add an event
                 if self.last_seen_at.get(pov_actor, None) != event.location:
-                    if not (('went to' in event.phrase) or
-                            ('made <his-1> way to' in event.phrase) or
-                            (event.phrase == '<1> <was-1> in <2>')):
-                        paragraph_events.append(Event('<1> <was-1> in <2>', [pov_actor, event.location]))
+                    if not event.kind.flags & (MOVEMENT | ARRIVAL):
+                        paragraph_events.append(Event(WAS_IN.phrase, [pov_actor, event.location]))
                 # if something exciting happened, tell the reader
                 for (obj, loc) in self.exciting_developments.get(pov_actor, []):
-                    paragraph_events.append(Event('<1> had found <2> in <3>', [pov_actor, obj, loc]))
+                    paragraph_events.append(Event(HAD_FOUND.phrase, [pov_actor, obj, loc]))
                 self.exciting_developments[pov_actor] = []
 
             # update our idea of where the character is, even if these are
             # not events we will be dumping out
             self.character_location[event.initiator()] = event.location
 
-            if event.location == self.character_location[pov_actor]:
+            # (a main character may not have done anything yet, if the
+            # chapter starts with someone else; then we don't know where
+            # they are, and nothing goes in, as in an IndexedEditor)
+            if event.location == self.character_location.get(pov_actor):
                 paragraph_events.append(event)
                 # update the reader's idea of where the character is
                 self.last_seen_at[event.initiator()] = event.location
@@ -233,115 +1043,374 @@ class Editor(object):
         return paragraph_events
 
     def publish_paragraph(self, paragraph_events):
-        for event in paragraph_events:
-            sys.stdout.write(str(event) + "  ")
-            #sys.stdout.write("\n")
-        print
-        print
+        self.sink.write(
+            ''.join([str(event) + "  " for event in paragraph_events]) +
+            "\n\n"
+        )
+
+
+class EventIndex(object):
+    """The events of a chapter, indexed so that an IndexedEditor can find
+    the ones that happen where its POV character is without looking at
+    all the others: for each location, and for each initiator, the
+    (ascending) positions of their events, and the positions of all the
+    exciting events.  It can be shared by any number of IndexedEditors.
+
+    """
+    def __init__(self, events):
+        self.events = list(events)
+        self.by_location = {}
+        self.by_initiator = {}
+        self.exciting = array('i')
+        for (n, event) in enumerate(self.events):
+            positions = self.by_location.get(event.location)
+            if positions is None:
+                positions = self.by_location[event.location] = array('i')
+            positions.append(n)
+            initiator = event.initiator()
+            positions = self.by_initiator.get(initiator)
+            if positions is None:
+                positions = self.by_initiator[initiator] = array('i')
+            positions.append(n)
+            if event.exciting:
+                self.exciting.append(n)
+
+    def __len__(self):
+        return len(self.events)
+
+    def stream(self):
+        return iter(self.events)
+
+    def location_of(self, actor, n):
+        """Return where the actor was, as far as the events up to and
+        including the nth can tell (None, if they haven't said.)
+
+        """
+        positions = self.by_initiator.get(actor, ())
+        k = bisect_right(positions, n) - 1
+        if k < 0:
+            return None
+        return self.events[positions[k]].location
+
+
+class IndexedEditor(Editor):
+    """An Editor that works from an EventIndex, instead of reading the
+    events one by one.  It picks out the same events for each paragraph
+    (and so writes the same chapter) as an Editor would, but only looks
+    at the events that go in it, and the exciting ones, and it hands
+    copies of them to its Transformers, so that the index can be edited
+    again.
+
+    """
+    def __init__(self, index, main_characters, sink=None, rng=None):
+        Editor.__init__(self, index, main_characters, sink=sink, rng=rng)
+        self.index = index
+        self.position = 0
+
+    def more_events(self):
+        return self.position < len(self.index)
+
+    def next_event(self):
+        event = self.index.events[self.position]
+        self.position += 1
+        return event
+
+    def generate_paragraph_events(self, pov_actor):
+        quota = self.random.randint(10, 25)
+        paragraph_events = []
+        if not self.more_events():
+            return paragraph_events
+        index = self.index
+        events = index.events
+        num_events = len(events)
+        start = self.position
+
+        # an event goes in if it happens where the POV character is; and
+        # that only changes when the POV character does something (and
+        # so is always where it happens.)
+        printed = set()
+        own_events = index.by_initiator.get(pov_actor, ())
+        n = start
+        while True:
+            event = events[n]
+            if not paragraph_events:
+                # this is the first sentence of the paragraph (see Editor)
+                if self.last_seen_at.get(pov_actor, None) != event.location:
+                    if not event.kind.flags & (MOVEMENT | ARRIVAL):
+                        paragraph_events.append(Event(WAS_IN.phrase, [pov_actor, event.location]))
+                for (obj, loc) in self.exciting_developments.get(pov_actor, []):
+                    paragraph_events.append(Event(HAD_FOUND.phrase, [pov_actor, obj, loc]))
+                self.exciting_developments[pov_actor] = []
+            here = index.location_of(pov_actor, n)
+            if event.location == here:
+                paragraph_events.append(event.copy())
+                self.last_seen_at[event.initiator()] = event.location
+                printed.add(n)
+            n += 1
+            if len(paragraph_events) >= quota or n >= num_events:
+                break
+            if paragraph_events:
+                # skip to the next event here, or the next thing the POV
+                # character does, whichever comes first
+                nearby = index.by_location.get(here, ())
+                k = bisect_left(nearby, n)
+                next_here = nearby[k] if k < len(nearby) else num_events
+                k = bisect_left(own_events, n)
+                next_own = own_events[k] if k < len(own_events) else num_events
+                n = min(next_here, next_own)
+                if n >= num_events:
+                    break
+        self.position = n
+
+        # exciting things that happened elsewhere, meanwhile
+        exciting = index.exciting
+        for k in xrange(bisect_left(exciting, start),
+                        bisect_left(exciting, self.position)):
+            n = exciting[k]
+            if n not in printed:
+                event = events[n]
+                self.exciting_developments.setdefault(event.initiator(), []).append(
+                    (event.participants[1], event.participants[2])
+                )
+
+        return paragraph_events
 
 
 class Transformer(object):
-    pass
+    """A Transformer rewrites the events of a paragraph into (hopefully)
+    more readable ones.
 
+    The easy way to write one is to implement transform(), which is given
+    the whole list of the paragraph's events and returns a new list.  When
+    such a Transformer is part of a Pipeline, it collects the events it is
+    fed, and transforms them all at once when the paragraph is flushed.
 
-class DeduplicateTransformer(Transformer):
-    # check for verbatim repeated. this could be 'dangerous' if, say,
-    # you have two characters, Bob Jones and Bob Smith, and both are
-    # named 'Bob', and they are actually two different events... but...
-    # for now that is an edge case.
-    def transform(self, editor, incoming_events, paragraph_num):
-        events = []
-        for event in incoming_events:
-            if events:
-                if str(event) == str(events[-1]):
-                    events[-1].phrase = event.phrase + ', twice'
-                elif str(event.rephrase(event.phrase + ', twice')) == str(events[-1]):
-                    events[-1].phrase = event.phrase + ', several times'
-                elif str(event.rephrase(event.phrase + ', several times')) == str(events[-1]):
-                    pass
-                else:
-                    events.append(event)
-            else:
-                events.append(event)
-        return events
+    The Transformers in this module are StreamingTransformers instead.
 
+    """
+    def begin(self, editor, paragraph_num, emit):
+        """Get ready to transform a new paragraph.  Events that come
+        out of this Transformer are to be passed to emit.
+
+        """
+        self.editor = editor
+        self.paragraph_num = paragraph_num
+        self.emit = emit
+        self.buffer = []
+
+    def feed(self, event):
+        self.buffer.append(event)
+
+    def flush(self):
+        """The paragraph is over; emit whatever is left."""
+        if self.buffer:
+            for event in self.transform(self.editor, self.buffer,
+                                        self.paragraph_num):
+                self.emit(event)
+        self.buffer = []
 
-class UsePronounsTransformer(Transformer):
-    # replace repeated proper nouns with pronouns
     def transform(self, editor, incoming_events, paragraph_num):
-        events = []
-        for event in incoming_events:
-            if events:
-                if event.initiator() == events[-1].initiator():
-                    event.phrase = event.phrase.replace('<1>', '<he-1>')
-                events.append(event)
-            else:
-                events.append(event)
-        return events
+        raise NotImplementedError
+
 
+class StreamingTransformer(Transformer):
+    """A Transformer which looks at the events one at a time, as they are
+    fed to it, and passes on the events it wants to keep by calling
+    self.emit().  It can still be used all at once, via transform().
+
+    """
+    def begin(self, editor, paragraph_num, emit):
+        self.editor = editor
+        self.paragraph_num = paragraph_num
+        self.emit = emit
+
+    def feed(self, event):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
 
-class MadeTheirWayToTransformer(Transformer):
     def transform(self, editor, incoming_events, paragraph_num):
         events = []
+        self.begin(editor, paragraph_num, events.append)
         for event in incoming_events:
-            if (events and
-                event.initiator() == events[-1].initiator()):
-                if (events[-1].phrase in ('<1> went to <2>',) and
-                     event.phrase == '<1> went to <2>'):
-                     assert event.location == event.participants[1]
-                     assert events[-1].previous_location() is not None
-                     assert events[-1].location == events[-1].participants[1]
-                     events[-1].phrase = '<1> made <his-1> way to <2>'
-                     events[-1].participants[1] = event.participants[1]
-                     events[-1].location = event.participants[1]
-                elif (events[-1].phrase in ('<1> made <his-1> way to <2>',) and
-                     event.phrase == '<1> went to <2>'):
-                     assert event.location == event.participants[1]
-                     assert events[-1].previous_location() is not None
-                     assert events[-1].location == events[-1].participants[1]
-                     events[-1].phrase = '<1> made <his-1> way to <2>'
-                     events[-1].participants[1] = event.participants[1]
-                     events[-1].location = event.participants[1]
-                else:
-                    events.append(event)
-            else:
-                events.append(event)
+            self.feed(event)
+        self.flush()
         return events
 
 
+class LookbackTransformer(StreamingTransformer):
+    """A StreamingTransformer which may rewrite the previous event in
+    light of the current one.  So it holds on to the previous event until
+    it knows it won't need to change it any more.
+
+    """
+    def begin(self, editor, paragraph_num, emit):
+        StreamingTransformer.begin(self, editor, paragraph_num, emit)
+        self.last = None
+
+    def merge(self, last, event):
+        """Return the event which should replace last, if event can be
+        combined into it, or None if it can't.
+
+        """
+        raise NotImplementedError
+
+    def feed(self, event):
+        if self.last is not None:
+            merged = self.merge(self.last, event)
+            if merged is not None:
+                self.last = merged
+                return
+            self.emit(self.last)
+        self.last = event
+
+    def flush(self):
+        if self.last is not None:
+            self.emit(self.last)
+            self.last = None
+
+
+class Pipeline(object):
+    """A chain of Transformers, each of which feeds the next.  Every
+    event of the paragraph passes through all of them in a single pass,
+    which gives the same results as running each Transformer over the
+    whole paragraph, one after the other.
+
+    """
+    def __init__(self, transformers):
+        self.transformers = transformers
+        self.head = None
+
+    def begin(self, editor, paragraph_num, emit):
+        for transformer in reversed(self.transformers):
+            transformer.begin(editor, paragraph_num, emit)
+            emit = transformer.feed
+        self.head = emit
+
+    def feed(self, event):
+        self.head(event)
+
+    def flush(self):
+        for transformer in self.transformers:
+            transformer.flush()
+
+
+class DeduplicateTransformer(LookbackTransformer):
+    # check for verbatim repeated. this could be 'dangerous' if, say,
+    # you have two characters, Bob Jones and Bob Smith, and both are
+    # named 'Bob', and they are actually two different events... but...
+    # for now that is an edge case.
+    # (the kinds are compared first, so we only render sentences that
+    # could possibly be the same.)
+    def merge(self, last, event):
+        kind = event.kind
+        last_kind = last.kind
+        if last_kind is kind:
+            if str(event) != str(last):
+                return None
+            last.phrase = event.phrase + ', twice'
+        elif last_kind.base is kind and last_kind.repeats == 2:
+            if self.suffixed(event, ', twice') != str(last):
+                return None
+            last.phrase = event.phrase + ', several times'
+        elif last_kind.base is kind and last_kind.repeats == 3:
+            if self.suffixed(event, ', several times') != str(last):
+                return None
+        else:
+            return None
+        return last
+
+    def suffixed(self, event, suffix):
+        """Return str(event.rephrase(event.phrase + suffix)), without going
+        to the trouble of making and rendering that event, if we can.
+
+        """
+        if (event.__class__ is Event and
+            event.speaker is None and event.addressed_to is None):
+            s = str(event)
+            return s[:-1] + suffix + s[-1]
+        return str(event.rephrase(event.phrase + suffix))
+
+
+class UsePronounsTransformer(StreamingTransformer):
+    # replace repeated proper nouns with pronouns
+    def begin(self, editor, paragraph_num, emit):
+        StreamingTransformer.begin(self, editor, paragraph_num, emit)
+        self.previous = None
+
+    def feed(self, event):
+        if (self.previous is not None and
+            event.initiator() == self.previous.initiator()):
+            event.phrase = event.phrase.replace('<1>', '<he-1>')
+        self.previous = event
+        self.emit(event)
+
+
+class MadeTheirWayToTransformer(LookbackTransformer):
+    def merge(self, last, event):
+        if (event.initiator() == last.initiator() and
+            last.kind in (WENT_TO, MADE_WAY_TO) and
+            event.kind is WENT_TO):
+            assert event.location == event.participants[1]
+            assert last.previous_location() is not None
+            assert last.location == last.participants[1]
+            last.phrase = MADE_WAY_TO.phrase
+            last.participants[1] = event.participants[1]
+            last.location = event.participants[1]
+            return last
+        return None
+
+
 # well well well
 from swallows.engine.objects import Actor
+from swallows.engine import seeding
+from swallows.engine.sinks import StreamSink, MemorySink
+from swallows.engine.snapshots import (
+    dump_snapshot, load_snapshot, dumps_snapshot, loads_snapshot,
+    save_snapshot, restore_snapshot, slot_names
+)
 weather = Actor('the weather')
 
 
-class AddWeatherFrifferyTransformer(Transformer):
-    def transform(self, editor, incoming_events, paragraph_num):
-        events = []
-        if paragraph_num == 1:
-            choice = random.randint(0, 3)
+class AddWeatherFrifferyTransformer(StreamingTransformer):
+    def begin(self, editor, paragraph_num, emit):
+        StreamingTransformer.begin(self, editor, paragraph_num, emit)
+        self.weather_pending = (paragraph_num == 1)
+
+    def feed(self, event):
+        if self.weather_pending:
+            self.weather_pending = False
+            choice = self.editor.random.randint(0, 3)
             if choice == 0:
-                events.append(Event("It was raining", [weather]))
+                self.emit(Event("It was raining", [weather]))
             if choice == 1:
-                events.append(Event("It was snowing", [weather]))
+                self.emit(Event("It was snowing", [weather]))
             if choice == 2:
-                events.append(Event("The sun was shining", [weather]))
+                self.emit(Event("The sun was shining", [weather]))
             if choice == 3:
-                events.append(Event("The day was overcast and humid", [weather]))
-        return events + incoming_events
-
-
-class AddParagraphStartFrifferyTransformer(Transformer):
-    def transform(self, editor, incoming_events, paragraph_num):
-        first_event = incoming_events[0]
-        if paragraph_num == 1:
-            return incoming_events
-        if str(first_event).startswith("'"):
-            return incoming_events
-        if " had found " in str(first_event):
-            return incoming_events
-        if " was in " in str(first_event):
-            return incoming_events
-        choice = random.randint(0, 8)
+                self.emit(Event("The day was overcast and humid", [weather]))
+        self.emit(event)
+
+
+class AddParagraphStartFrifferyTransformer(StreamingTransformer):
+    def begin(self, editor, paragraph_num, emit):
+        StreamingTransformer.begin(self, editor, paragraph_num, emit)
+        self.first = True
+
+    def feed(self, event):
+        if self.first:
+            self.first = False
+            event = self.embellish(event)
+        self.emit(event)
+
+    def embellish(self, first_event):
+        if self.paragraph_num == 1:
+            return first_event
+        # leave dialogue, and sentences that set the scene, alone
+        if first_event.kind.flags & (DIALOGUE | DISCOVERY | LOCATING):
+            return first_event
+        choice = self.editor.random.randint(0, 8)
         if choice == 0:
             first_event = first_event.rephrase(
                 "Later on, " + first_event.phrase
@@ -358,50 +1427,84 @@ class AddParagraphStartFrifferyTransformer(Transformer):
             first_event = first_event.rephrase(
                 "Feeling anxious, " + first_event.phrase
             )
-        return [first_event] + incoming_events[1:]
+        return first_event
 
 
-class AggregateEventsTransformer(Transformer):
+class AggregateEventsTransformer(LookbackTransformer):
     # replace "Bob went to the kitchen.  Bob saw the toaster"
     # with "Bob went to the kitchen, where he saw the toaster"
-    def transform(self, editor, incoming_events, paragraph_num):
-        events = []
-        for event in incoming_events:
-            if events:
-                if ( event.initiator() == events[-1].initiator() and
-                     events[-1].phrase in ('<1> went to <2>',) and
-                     event.phrase in ('<1> saw <2>',) ):
-                    # this *might* be better if we only do it when <1>
-                    # is the pov character for this paragraph.  but it
-                    # does work...
-                    event.phrase = event.phrase.replace('<1>', '<he-1>')
-                    events[-1] = AggregateEvent(
-                        "%s, where %s", [events[-1], event],
-                        excl = event.excl)
-                else:
-                    events.append(event)
-            else:
-                events.append(event)
-        return events
-
-
-class DetectWanderingTransformer(Transformer):
+    def merge(self, last, event):
+        if ( event.initiator() == last.initiator() and
+             last.kind is WENT_TO and
+             event.kind is SAW ):
+            # this *might* be better if we only do it when <1>
+            # is the pov character for this paragraph.  but it
+            # does work...
+            event.phrase = event.phrase.replace('<1>', '<he-1>')
+            return AggregateEvent(
+                "%s, where %s", [last, event],
+                excl = event.excl)
+        return None
+
+
+class DetectWanderingTransformer(StreamingTransformer):
     # not used yet
     # if they 'made their way' to their current location...
-    def transform(self, editor, incoming_events, paragraph_num):
-        events = []
-        for event in incoming_events:
-            if (event.phrase == '<1> made <his-1> way to <2>' and
-                event.location == event.previous_location()):
-                event.phrase = '<1> wandered around for a bit, then came back to <2>'
-            events.append(event)
-        return events
+    def feed(self, event):
+        if (event.kind is MADE_WAY_TO and
+            event.location == event.previous_location()):
+            event.phrase = WANDERED.phrase
+        self.emit(event)
+
+
+def standard_transformers(friffery=False):
+    """Return a new list of the Transformers the Publisher uses, in order."""
+    transformers = [
+        MadeTheirWayToTransformer(),
+        DeduplicateTransformer(),
+        AggregateEventsTransformer(),
+        DetectWanderingTransformer(),
+        # this one should be last, so prior transformers don't
+        # have to worry themselves about looking for pronouns
+        UsePronounsTransformer(),
+    ]
+    if friffery:
+        transformers.append(AddWeatherFrifferyTransformer())
+        transformers.append(AddParagraphStartFrifferyTransformer())
+    return transformers
+
+
+class Edition(object):
+    """One of several books a Publisher can make, all at once, out of the
+    same simulated events.  Each edition is written to its own sink, and
+    may have its own title, follow its own main characters, and use its
+    own Transformers: transformers, if given, is a function which returns
+    a new list of them for each chapter.  (If the Publisher uses other
+    processes, it has to be one that can be pickled.)  Otherwise, it's
+    the Publisher's.
+
+    """
+    def __init__(self, sink, title=None, main_characters=None,
+                 transformers=None):
+        self.sink = sink
+        self.title = title
+        self.main_characters = main_characters
+        self.transformers = transformers
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['sink'] = None
+        return state
 
 
 class Publisher(object):
     def __init__(self, characters=(), setting=(), friffery=False,
                  debug=False, title='Untitled', chapters=18,
-                 events_per_chapter=810):
+                 events_per_chapter=810, streaming=False, sink=None,
+                 independent_chapters=False, processes=None, seed=None,
+                 columnar=False, event_log=None,
+                 scheduler=RoundRobinScheduler, main_characters=None,
+                 level_of_detail=False, editions=None, checkpoint=None):
         self.characters = characters
         self.setting = setting
         self.friffery = friffery
@@ -409,63 +1512,364 @@ class Publisher(object):
         self.title = title
         self.chapters = chapters
         self.events_per_chapter = events_per_chapter
+        # in streaming mode, the Editor starts writing before the chapter
+        # has been fully simulated.  debug mode wants to see the whole
+        # chapter first, though, so it always turns streaming off.
+        self.streaming = (streaming and not debug and not event_log and
+                          not editions)
+        # in columnar mode, a chapter's events are kept in a
+        # ColumnarEventCollector, which takes much less memory.
+        self.columnar = columnar
+        # if given, the events of each chapter are saved to an event log
+        # file of this name (with %(chapter)d replaced by the chapter
+        # number), before editing.  so it turns streaming off, too.
+        self.event_log = event_log
+        # the class of Scheduler that decides whose turn it is; a new one
+        # is made for each chapter.  how they did, all told, goes in
+        # scheduling_stats (except for chapters generated in other
+        # processes.)
+        self.scheduler = scheduler
+        self.scheduling_stats = SchedulerStats()
+        # the characters the Editor follows, in turn; by default, all of
+        # them.  the others only show up when they are where one of these is.
+        self.main_characters = main_characters or characters
+        # with level of detail, characters who aren't where any main
+        # character is (ours, or any edition's) don't make Events (see
+        # Scheduler.watch.)  so it only makes a difference if there are
+        # fewer main characters than characters.  the events_per_chapter
+        # are then all events that could be read, and many more turns are
+        # simulated to get them.
+        self.level_of_detail = level_of_detail
+        # if given, a list of Editions; then, instead of one book, written
+        # to sink, each chapter is edited once for each of them, from an
+        # EventIndex of its events.  (only debugging output goes to sink.)
+        # so this turns streaming off, too.
+        self.editions = editions
+        if sink is None:
+            sink = StreamSink()
+        self.sink = sink
+        # if a seed is given, each chapter, and each character in each
+        # chapter, gets its own stream of random numbers derived from it;
+        # otherwise everything comes from the random module.
+        self.seed = seed
+        # with independent chapters, every chapter starts over from a copy
+        # of the world as it was before the first chapter.  so they can be
+        # generated in any order, or all at once in a pool of processes.
+        self.processes = processes
+        self.independent_chapters = independent_chapters or bool(processes)
+        # how many events have been simulated, all told
+        self.num_events = 0
+        # if given, the name of a file to which a snapshot of the world,
+        # and of everything else the rest of the novel depends on, is
+        # saved after each chapter.  then, if we are stopped, publish()
+        # can be told to resume from there.
+        self.checkpoint = checkpoint
+
+    def __getstate__(self):
+        # the sink stays behind when we are sent to another process
+        state = self.__dict__.copy()
+        state['sink'] = None
+        return state
 
     def publish_chapter(self, chapter_num):
-        collector = EventCollector()
-        
+        if self.seed is not None:
+            rng = seeding.stream(self.seed, 'chapter', chapter_num)
+            for character in self.characters:
+                character.random = seeding.stream(
+                    self.seed, 'chapter', chapter_num,
+                    'character', character.name
+                )
+        else:
+            rng = random
+
+        scheduler = self.scheduler(self.characters,
+                                   stats=self.scheduling_stats)
+        if self.streaming:
+            collector = StreamingEventCollector(
+                self.characters, self.events_per_chapter, scheduler=scheduler
+            )
+        elif self.columnar:
+            collector = ColumnarEventCollector()
+        else:
+            collector = EventCollector()
+
         for character in self.characters:
             character.collector = collector
             # don't continue a conversation from the previous chapter, please
             character.topic = None
-            character.place_in(random.choice(self.setting))
+        if self.level_of_detail:
+            scheduler.watch(self.watched_characters(), collector)
+        for character in self.characters:
+            character.place_in(rng.choice(self.setting))
 
-        while len(collector.events) < self.events_per_chapter:
-            for character in self.characters:
-                character.live()
-                #print len(collector.events) # , repr([str(e) for e in collector.events])
+        # (when streaming, the collector runs the simulation itself)
+        if not self.streaming:
+            scheduler.run(collector, self.events_per_chapter)
 
         if self.debug:
+            write = self.sink.write
             for character in self.characters:
-                print "%s'S EVENTS:" % character.name.upper()                
+                write("%s'S EVENTS:\n" % character.name.upper())
                 for event in collector.events:
                     if event.participants[0] != character:
                         continue
-                    print "%r in %s: %s" % (
+                    write("%r in %s: %s\n" % (
                         [p.render(event=event) for p in event.participants],
                         event.location.render(),
                         event.phrase
-                    )
-                print
+                    ))
+                write("\n")
             for character in self.characters:
-                print "%s'S STATE:" % character.name.upper()
-                character.dump_beliefs()
-                print
-            print "- - - - -"
-            print
-
-        editor = Editor(collector, self.characters)
-        editor.add_transformer(MadeTheirWayToTransformer())
-        editor.add_transformer(DeduplicateTransformer())
-        editor.add_transformer(AggregateEventsTransformer())
-        editor.add_transformer(DetectWanderingTransformer())
-        # this one should be last, so prior transformers don't
-        # have to worry themselves about looking for pronouns
-        editor.add_transformer(UsePronounsTransformer())
-        # this should be a matter of configuring what transformers
-        # to use, when you instantiate a Publisher
-        if self.friffery:
-            editor.add_transformer(AddWeatherFrifferyTransformer())
-            editor.add_transformer(AddParagraphStartFrifferyTransformer())
-        editor.publish()
+                write("%s'S STATE:\n" % character.name.upper())
+                character.dump_beliefs(self.sink)
+                write("\n")
+            write("%s, %s\n" % (render_stats, str_stats))
+            write("%s\n" % self.scheduling_stats)
+            write("- - - - -\n")
+            write("\n")
+
+        if self.event_log:
+            save_event_log(collector,
+                           self.event_log % {'chapter': chapter_num},
+                           main_characters=self.main_characters, rng=rng,
+                           friffery=self.friffery)
+
+        if self.editions:
+            self.publish_editions(collector, rng)
+        else:
+            editor = Editor(collector, self.main_characters, sink=self.sink,
+                            rng=rng)
+            # this should be a matter of configuring what transformers
+            # to use, when you instantiate a Publisher
+            for transformer in standard_transformers(self.friffery):
+                editor.add_transformer(transformer)
+            editor.publish()
+        self.num_events += collector.num_collected
+
+    def publish_editions(self, collector, rng):
+        # every edition's Editor starts with its random numbers where
+        # ours are now, so an edition like the usual book comes out the
+        # same as it would have
+        index = EventIndex(collector.events)
+        state = rng.getstate()
+        for edition in self.editions:
+            edition_rng = seeding.Stream()
+            edition_rng.setstate(state)
+            editor = IndexedEditor(
+                index, edition.main_characters or self.main_characters,
+                sink=edition.sink, rng=edition_rng
+            )
+            if edition.transformers is None:
+                transformers = standard_transformers(self.friffery)
+            else:
+                transformers = edition.transformers()
+            for transformer in transformers:
+                editor.add_transformer(transformer)
+            editor.publish()
 
-    def publish(self):
-        print self.title
-        print "=" * len(self.title)
-        print
+    def watched_characters(self):
+        """Return a list of our main characters, and those of our editions.
+        With level of detail, it's what these can see that makes Events.
+
+        """
+        watched = list(self.main_characters)
+        for edition in self.editions or ():
+            for character in edition.main_characters or ():
+                if character not in watched:
+                    watched.append(character)
+        return watched
+
+    def books(self):
+        """Return a list of (sink, title) for each book we are writing."""
+        if not self.editions:
+            return [(self.sink, self.title)]
+        return [(edition.sink, edition.title or self.title)
+                for edition in self.editions]
+
+    def sinks(self):
+        """Return a list of every sink we write to: those of the books,
+        and, if we have editions, our own (which gets debugging output.)
 
-        for chapter in range(1, self.chapters+1):
-            print "Chapter %d." % chapter
-            print "-----------"
-            print
+        """
+        sinks = [sink for (sink, title) in self.books()]
+        if self.editions:
+            sinks.append(self.sink)
+        return sinks
+
+    def save_checkpoint(self, chapter_num):
+        """Save a snapshot of everything that the chapters after the given
+        one depend on, to the checkpoint file.
+
+        """
+        save_snapshot({
+            'chapter': chapter_num,
+            'characters': self.characters,
+            'setting': self.setting,
+            'main_characters': self.main_characters,
+            'edition_main_characters': [edition.main_characters
+                                        for edition in self.editions or ()],
+            'seed': self.seed,
+            'random_state': random.getstate(),
+            'num_events': self.num_events,
+            'scheduling_stats': self.scheduling_stats,
+            'cache_stats': [(stats.hits, stats.misses)
+                            for stats in (render_stats, str_stats)],
+            'sinks': [(sink.chars_written, sink.words_written)
+                      for sink in self.sinks()],
+        }, self.checkpoint)
+
+    def restore_checkpoint(self):
+        """Put everything back the way it was when the checkpoint file was
+        saved, including what had been written to our sinks, and return
+        the number of the chapter it was saved after.  If there is no
+        checkpoint file yet, start our sinks over, and return 0.
 
-            self.publish_chapter(chapter)
+        """
+        sinks = self.sinks()
+        if not os.path.exists(self.checkpoint):
+            for sink in sinks:
+                sink.resume(0, 0)
+            return 0
+        state = restore_snapshot(self.checkpoint)
+        self.characters = state['characters']
+        self.setting = state['setting']
+        self.main_characters = state['main_characters']
+        for (edition, main_characters) in zip(
+                self.editions or (), state['edition_main_characters']):
+            edition.main_characters = main_characters
+        self.seed = state['seed']
+        random.setstate(state['random_state'])
+        self.num_events = state['num_events']
+        self.scheduling_stats = state['scheduling_stats']
+        for (stats, (hits, misses)) in zip((render_stats, str_stats),
+                                           state['cache_stats']):
+            stats.hits = hits
+            stats.misses = misses
+        for (sink, (chars_written, words_written)) in zip(
+                sinks, state['sinks']):
+            sink.resume(chars_written, words_written)
+        return state['chapter']
+
+    def publish(self, resume=False):
+        """Write the novel to our sink (or the books to the sinks of our
+        editions.)  If resume is true, and a checkpoint has been saved,
+        carry on from there instead: the novel comes out the same as if
+        we had never been stopped.  Our sinks should then be ones that
+        keep what is already written, like a FileSink with resuming=True.
+
+        """
+        books = self.books()
+        first_chapter = 1
+        if resume and self.checkpoint:
+            first_chapter = self.restore_checkpoint() + 1
+        if first_chapter == 1:
+            for (sink, title) in books:
+                sink.write("%s\n" % title)
+                sink.write("%s\n" % ("=" * len(title)))
+                sink.write("\n")
+
+        if self.independent_chapters:
+            chapters = self.publish_independent_chapters(first_chapter)
+        else:
+            chapters = None
+
+        for chapter in range(first_chapter, self.chapters+1):
+            for (sink, title) in books:
+                sink.write("Chapter %d.\n" % chapter)
+                sink.write("-----------\n")
+                sink.write("\n")
+
+            if chapters is not None:
+                (texts, num_events) = next(chapters)
+                for ((sink, title), text) in zip(books, texts):
+                    sink.write(text)
+                self.num_events += num_events
+            else:
+                self.publish_chapter(chapter)
+            for sink in self.sinks():
+                sink.flush()
+            if self.checkpoint:
+                self.save_checkpoint(chapter)
+
+    def publish_independent_chapters(self, first_chapter=1):
+        """Return an iterator over the texts of all the chapters from
+        first_chapter on (a list of them, one for each book, and how many
+        events each took), in order.  Each is published by a fresh copy of
+        this Publisher (and of its world), made from a snapshot of it.
+
+        """
+        if self.seed is None:
+            self.seed = random.getrandbits(32)
+        snapshot = dumps_snapshot(self)
+        jobs = [(snapshot, chapter)
+                for chapter in range(first_chapter, self.chapters+1)]
+        if not self.processes:
+            return (publish_independent_chapter(job) for job in jobs)
+        return imap_in_pool(self.processes, publish_independent_chapter, jobs)
+
+
+def imap_in_pool(processes, function, jobs):
+    """Like map(function, jobs), but run in a pool of the given number of
+    processes.  The pool is shut down once all the results are in (or
+    torn down, if something goes wrong, or we stop asking for them.)
+
+    """
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(function, jobs):
+            yield result
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+
+def publish_independent_chapter(job):
+    """Publish a single chapter from a snapshot of a Publisher, and return
+    its text in each book and the number of events simulated for it.  This
+    is what the worker processes of a Publisher run.
+
+    """
+    (snapshot, chapter_num) = job
+    publisher = loads_snapshot(snapshot)
+    # (we may have been resumed, and so have counted some already)
+    publisher.num_events = 0
+    publisher.sink = MemorySink()
+    for edition in publisher.editions or ():
+        edition.sink = MemorySink()
+    publisher.publish_chapter(chapter_num)
+    return ([sink.getvalue() for (sink, title) in publisher.books()],
+            publisher.num_events)
+
+
+def replay_event_log(filename, transformers=None, main_characters=None,
+                     sink=None, rng=None, friffery=None):
+    """Edit the events in an event log file again, and write them to
+    sink.  By default, the Publisher's usual Transformers are used (with
+    friffery if the Publisher that saved the log had it, or if friffery
+    is true), the main characters are the ones the log was saved with,
+    and the random numbers start where they did when the log was saved
+    (if they were saved with it), so the chapter comes out the same as
+    it did the first time.
+
+    """
+    log = EventLog(filename)
+    try:
+        if transformers is None:
+            if friffery is None:
+                friffery = log.friffery
+            transformers = standard_transformers(friffery=friffery)
+        if main_characters is None:
+            main_characters = log.main_characters
+        if rng is None and log.random_state is not None:
+            rng = seeding.Stream()
+            rng.setstate(log.random_state)
+        editor = Editor(log, main_characters, sink=sink, rng=rng)
+        for transformer in transformers:
+            editor.add_transformer(transformer)
+        editor.publish()
+    finally:
+        log.close()
@@ -1,7 +1,7 @@
-import random
+from collections import OrderedDict
 import sys
 
-from swallows.engine.events import Event
+from swallows.engine.seeding import global_random
 
 ### TOPICS ###
 
@@ -10,21 +10,23 @@ from swallows.engine.events import Event
 # (for example, a gesture.)
 
 class Topic(object):
+    __slots__ = ('originator', 'subject')
+
     def __init__(self, originator, subject=None):
         self.originator = originator
         self.subject = subject
 
 
 class GreetTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class SpeechTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class QuestionTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 ### BELIEFS ###
@@ -45,12 +47,16 @@ class QuestionTopic(Topic):
 
 # abstract base class
 class Belief(object):
+    __slots__ = ('subject',)
+
     # constructor of all subclasses of this class should accept being
     # called with only one argument, as a convenience sort of thing
     # for BeliefSet.get and .remove, which don't really care about anything
     # about the Belief except for its class and its subject.
     # although, usually, you do want to pass more than one argument when
     # making a real Belief to pass to BeliefSet.add.  (clear as mud, right?)
+    # (BeliefSet.lookup and .discard skip all that, and just take the
+    # class and the subject.)
     def __init__(self, subject):          # kind of silly for an ABC to have a
         assert isinstance(subject, Actor) # constructor, but it is to emphasize
         self.subject = subject            # that all beliefs have a subject,
@@ -62,6 +68,8 @@ class Belief(object):
 
 
 class ItemLocation(Belief):   # formerly "Memory"
+    __slots__ = ('location', 'informant', 'concealer')
+
     def __init__(self, subject, location=None, informant=None, concealer=None):
         assert isinstance(subject, Actor)
         assert isinstance(location, Actor) or location is None
@@ -83,6 +91,8 @@ class ItemLocation(Belief):   # formerly "Memory"
 
 
 class Goal(Belief):
+    __slots__ = ('phrase',)
+
     def __init__(self, subject, phrase=None):
         assert isinstance(subject, Actor)
         self.subject = subject   # the thing we would like to do something about
@@ -96,6 +106,8 @@ class Goal(Belief):
 
 
 class Desire(Goal):
+    __slots__ = ()
+
     def __init__(self, subject):
         assert isinstance(subject, Actor)
         self.subject = subject   # the thing we would like to acquire
@@ -108,6 +120,8 @@ class Desire(Goal):
 
 # oh dear
 class BeliefsBelief(Belief):
+    __slots__ = ('belief_set',)
+
     def __init__(self, subject, belief_set=None):
         assert isinstance(subject, Animate)
         self.subject = subject        # the animate we think holds the belief
@@ -137,46 +151,135 @@ class BeliefSet(object):
     (Besides, it might change.)
 
     """
+    __slots__ = ('belief_map', 'subject_order', 'located_at', 'of_class')
+
     def __init__(self):
-        self.belief_map = {}
+        # ordered, so that we consider subjects in the same order every
+        # time the same story is told.  a subject gets in here when we
+        # first believe something about it, and keeps its place even if we
+        # later stop believing anything about it.
+        self.belief_map = OrderedDict()
+        # where each subject came in that order, so that we can put other
+        # lists of beliefs in the same order
+        self.subject_order = {}
+        # a reverse index: location -> {subject: ItemLocation}, for every
+        # ItemLocation in the set
+        self.located_at = {}
+        # and another: class -> {subject: belief of exactly that class}
+        self.of_class = {}
+
+    def unlocate(self, belief):
+        here = self.located_at[belief.location]
+        del here[belief.subject]
+        if not here:
+            del self.located_at[belief.location]
 
     def add(self, belief):
         assert isinstance(belief, Belief)
         subject = belief.subject
-        self.belief_map.setdefault(subject, {})[belief.__class__] = belief
+        class_ = belief.__class__
+        beliefs = self.belief_map.get(subject)
+        if beliefs is None:
+            beliefs = self.belief_map[subject] = {}
+            self.subject_order[subject] = len(self.subject_order)
+        existing = beliefs.get(class_)
+        beliefs[class_] = belief
+        these = self.of_class.get(class_)
+        if these is None:
+            these = self.of_class[class_] = {}
+        these[subject] = belief
+        if class_ is ItemLocation:
+            location = belief.location
+            if existing is not None and existing.location is not location:
+                self.unlocate(existing)
+            here = self.located_at.get(location)
+            if here is None:
+                here = self.located_at[location] = {}
+            here[subject] = belief
+
+    # lookup and discard are the quick way to get at a belief: they only
+    # need its class and subject, and they don't make anything new.
+
+    def lookup(self, class_, subject):
+        """Return the belief of the given class about the given subject,
+        or None.
+
+        """
+        beliefs = self.belief_map.get(subject)
+        if beliefs is None:
+            return None
+        return beliefs.get(class_)
+
+    def discard(self, class_, subject):
+        """Remove the belief of the given class about the given subject,
+        if there is one.
+
+        """
+        beliefs = self.belief_map.get(subject)
+        if beliefs is None or class_ not in beliefs:
+            return
+        existing = beliefs.pop(class_)
+        these = self.of_class[class_]
+        del these[subject]
+        if not these:
+            del self.of_class[class_]
+        if class_ is ItemLocation:
+            self.unlocate(existing)
+
+    # get and remove are the older way: the particular belief passed to
+    # them doesn't really matter.  we extract the class and subject and
+    # look for any existing belief we may have
 
     def remove(self, belief):
-        # the particular belief passed to us doesn't really matter.  we extract
-        # the class and subject and return any existing belief we may have
         assert isinstance(belief, Belief)
-        subject = belief.subject
-        beliefs = self.belief_map.setdefault(subject, {})
-        if belief.__class__ in beliefs:
-            del beliefs[belief.__class__]
+        self.discard(belief.__class__, belief.subject)
 
     def get(self, belief):
-        # the particular belief passed to us doesn't really matter.  we extract
-        # the class and subject and return any existing belief we may have
         assert isinstance(belief, Belief)
-        subject = belief.subject
-        return self.belief_map.setdefault(subject, {}).get(
-            belief.__class__, None
-        )
+        return self.lookup(belief.__class__, belief.subject)
+
+    def beliefs_located_at(self, location):
+        """Return a list of the ItemLocations which say that something is
+        at the given location, in the same order as subjects() would
+        find them.  This doesn't look at any of the other beliefs.
+
+        """
+        here = self.located_at.get(location)
+        if not here:
+            return []
+        order = self.subject_order
+        return sorted(here.values(), key=lambda b: order[b.subject])
 
     def subjects(self):
         for subject in self.belief_map:
             yield subject
 
     def beliefs_for(self, subject):
-        beliefs = self.belief_map.setdefault(subject, {})
-        for class_ in beliefs:
+        # by class name, so that they come out in the same order whatever
+        # the dict's order is (it differs between Python 2 and 3)
+        beliefs = self.belief_map.get(subject, {})
+        for class_ in sorted(beliefs, key=lambda c: c.__name__):
             yield beliefs[class_]
 
-    def beliefs_of_class(self, class_):
-        for subject in self.subjects():
-            for belief in self.beliefs_for(subject):
-                if belief.__class__ == class_:
-                    yield belief
+    def beliefs_of_class(self, class_, subclasses=False):
+        """Return a list of the beliefs of the given class, in the same
+        order as subjects() would find them.  If subclasses is true, include
+        beliefs of any subclass of it, too.
+
+        """
+        if subclasses:
+            found = []
+            for (other_class, these) in self.of_class.items():
+                if issubclass(other_class, class_):
+                    found.extend(these.values())
+        else:
+            found = self.of_class.get(class_)
+            if not found:
+                return []
+            found = found.values()
+        order = self.subject_order
+        return sorted(found, key=lambda b: (order[b.subject],
+                                            b.__class__.__name__))
 
     def __str__(self):
         l = []
@@ -188,11 +291,119 @@ class BeliefSet(object):
 
 ### ACTORS (objects in the world) ###
 
+# a dict that remembers the order its keys were put in: under Python 3.7
+# and up, every dict does, and a plain one is quicker to look through
+if sys.version_info >= (3, 7):
+    ordered_dict = dict
+else:
+    ordered_dict = OrderedDict
+
+
+class Contents(object):
+    """The Actors that are inside some Actor.  This works like a set(),
+    except that it remembers the order things were put into it, so that
+    looking through it goes the same way every time the same story is
+    told -- even in another process, or in a copy of the world.
+
+    It also keeps, in the same order, separate collections of the
+    animates, containers, notable things and takeable things in it, so
+    that looking around a cluttered room doesn't mean asking everything in
+    it what it is.  Only add and remove keep these up to date, so use only
+    them.
+
+    All of these are dicts that remember the order their keys were put
+    in (see ordered_dict), whose keys are the Actors (the values don't
+    matter), so that putting things in and taking them out is as quick in
+    a warehouse as in a broom cupboard.  Most of them stay empty, though,
+    so each is only made when something is first put in it; until then,
+    it's NOTHING.  Only the Actors in it are pickled, as a list, so that a
+    world pickled by Python 3 comes back in the same order in Python 2;
+    the rest is made again from them.
+
+    """
+    __slots__ = ('members', 'animates', 'containers', 'notables',
+                 'takeables')
+
+    # an empty collection, which can be looked through like any other
+    NOTHING = ()
+
+    # which of the collections each class of Actor goes in; worked out the
+    # first time we see an Actor of that class
+    indexes_of_class = {}
+
+    def __init__(self):
+        self.members = self.NOTHING
+        self.animates = self.NOTHING
+        self.containers = self.NOTHING
+        self.notables = self.NOTHING
+        self.takeables = self.NOTHING
+
+    def __getstate__(self):
+        return {'members': list(self.members)}
+
+    def __setstate__(self, state):
+        self.__init__()
+        for actor in state['members']:
+            self.add(actor)
+
+    def indexes_of(self, actor):
+        """Return the names of the collections the actor goes in."""
+        cls = actor.__class__
+        names = Contents.indexes_of_class.get(cls)
+        if names is None:
+            names = ('members',) + tuple(
+                name + 's' for name in
+                ('animate', 'container', 'notable', 'takeable')
+                if getattr(actor, name)()
+            )
+            Contents.indexes_of_class[cls] = names
+        return names
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, actor):
+        return actor in self.members
+
+    def add(self, actor):
+        if actor in self.members:
+            return
+        for name in self.indexes_of(actor):
+            index = getattr(self, name)
+            if index is self.NOTHING:
+                index = ordered_dict()
+                setattr(self, name, index)
+            index[actor] = None
+
+    def remove(self, actor):
+        if actor not in self.members:
+            raise KeyError(actor)
+        for name in self.indexes_of(actor):
+            del getattr(self, name)[actor]
+
+
+# what an Actor is called from each perspective, as indexes into its
+# renderings (see Actor.refresh_renderings.)  the first four are for
+# render(); when the actor has an owner, they differ in what replaces the
+# <*> in its name.
+GENERIC = 0             # "Bob's bedroom"
+SPEAKER_OWNED = 1       # "my bedroom", in something Bob says
+ADDRESSEE_OWNED = 2     # "your bedroom", in something said to Bob
+INITIATOR_OWNED = 3     # "his bedroom", in something Bob does
+INDEFINITE = 4          # "a bedroom"
+
+
 class Actor(object):
+    __slots__ = ('_name', 'collector', 'contents', 'enter', '_owner',
+                 'location', 'renderings')
+
     def __init__(self, name, location=None, owner=None, collector=None):
-        self.name = name
+        self._name = name
         self.collector = collector
-        self.contents = set()
+        self.contents = Contents()
         self.enter = ""
         self.owner = owner
         self.location = None
@@ -248,44 +459,83 @@ class Actor(object):
         self.location = location
         self.location.contents.add(self)
 
+    def get_name(self):
+        return self._name
+
+    def set_name(self, name):
+        self._name = name
+        self.refresh_renderings()
+
+    name = property(get_name, set_name)
+
+    def get_owner(self):
+        return self._owner
+
+    def set_owner(self, owner):
+        self._owner = owner
+        self.refresh_renderings()
+
+    owner = property(get_owner, set_owner)
+
+    def refresh_renderings(self):
+        """Work out, once, what we call this object from each perspective,
+        so that render() and indefinite() need only look it up.  Called
+        whenever our name or owner changes.  (If our owner's name changes,
+        this needs to be called again too, but no one gets renamed.)
+
+        """
+        name = self._name
+        owner = self._owner
+        if owner is None:
+            names = (name,) * 4
+        else:
+            names = tuple(name.replace('<*>', repl) for repl in (
+                owner.render() + "'s", 'my', 'your', owner.posessive()
+            ))
+        article = self.article()
+        if article:
+            names = tuple('%s %s' % (article, n) for n in names)
+        self.renderings = names + (
+            '%s %s' % (self.indefinite_article(), name),
+        )
+
     def render(self, event=None):
         """Return a string containing what we call this object, in the context
         of the given event (which may be None, to get a 'generic' description.)
 
         """
-        name = self.name
-        repl = None
-        if self.owner is not None:
-            repl = self.owner.render() + "'s"
-        if event:
-            if event.speaker is self.owner:
-                repl = 'my'
-            elif event.addressed_to is self.owner:
-                repl = 'your'
-            elif event.initiator() is self.owner:
-                repl = event.initiator().posessive()
-        if repl is not None:
-            name = name.replace('<*>', repl)
-        article = self.article()
-        if not article:
-            return name
-        return '%s %s' % (article, name)
+        owner = self._owner
+        if event is None or owner is None:
+            return self.renderings[GENERIC]
+        if event.speaker is owner:
+            return self.renderings[SPEAKER_OWNED]
+        elif event.addressed_to is owner:
+            return self.renderings[ADDRESSEE_OWNED]
+        elif event.initiator() is owner:
+            return self.renderings[INITIATOR_OWNED]
+        return self.renderings[GENERIC]
+
+    def indefinite_article(self):
+        if self._name.startswith(('a', 'e', 'i', 'o', 'u')):
+            return 'an'
+        return 'a'
 
     def indefinite(self):
-        article = 'a'
-        if self.name.startswith(('a', 'e', 'i', 'o', 'u')):
-            article = 'an'
-        return '%s %s' % (article, self.name)
+        return self.renderings[INDEFINITE]
 
 
 ### some mixins for Actors ###
 
 class ProperMixin(object):
+    __slots__ = ()
+
     def article(self):
         return ''
 
 
 class PluralMixin(object):
+    __slots__ = ()
+
     def posessive(self):
         return "their"
 
@@ -295,9 +545,8 @@ class PluralMixin(object):
     def pronoun(self):
         return "they"
 
-    def indefinite(self):
-        article = 'some'
-        return '%s %s' % (article, self.name)
+    def indefinite_article(self):
+        return 'some'
 
     def was(self):
         return "were"
@@ -307,6 +556,8 @@ class PluralMixin(object):
 
 
 class MasculineMixin(object):
+    __slots__ = ()
+
     def posessive(self):
         return "his"
 
@@ -318,6 +569,8 @@ class MasculineMixin(object):
 
 
 class FeminineMixin(object):
+    __slots__ = ()
+
     def posessive(self):
         return "her"
 
@@ -331,21 +584,28 @@ class FeminineMixin(object):
 ### ANIMATE OBJECTS ###
 
 class Animate(Actor):
+    __slots__ = ('topic', 'beliefs', 'random', 'scheduler')
+
     def __init__(self, name, location=None, owner=None, collector=None):
         Actor.__init__(
             self, name, location=location, owner=owner, collector=None
         )
         self.topic = None
         self.beliefs = BeliefSet()
+        # where this Animate gets its random numbers from.  by default,
+        # the random module, but the Publisher can give it its own stream.
+        self.random = global_random
+        # the Scheduler that gives this Animate its turns, if any
+        self.scheduler = None
 
     def animate(self):
         return True
 
     # for debugging
-    def dump_beliefs(self):
+    def dump_beliefs(self, out=sys.stdout):
         for subject in self.beliefs.subjects():
             for belief in self.beliefs.beliefs_for(subject):
-                print ".oO{ %s }" % belief
+                out.write(".oO{ %s }\n" % belief)
 
     ###--- belief accessors/manipulators ---###
     
@@ -372,24 +632,24 @@ class Animate(Actor):
 
     def recall_location(self, thing):
         """Return an ItemLocation (belief) about this thing, or None."""
-        return self.beliefs.get(ItemLocation(thing))
+        return self.beliefs.lookup(ItemLocation, thing)
 
     def forget_location(self, thing):
-        self.beliefs.remove(ItemLocation(thing))
+        self.beliefs.discard(ItemLocation, thing)
 
     def desire(self, thing):
         self.beliefs.add(Desire(thing))
 
     def quench_desire(self, thing):
         # usually called when it has been acquired
-        self.beliefs.remove(Desire(thing))
+        self.beliefs.discard(Desire, thing)
 
     def does_desire(self, thing):
         if thing.treasure():
             return True  # omg YES
         if thing.weapon():
             return True  # could come in handy.  (TODO, sophisticate this?)
-        return self.beliefs.get(Desire(thing)) is not None
+        return self.beliefs.lookup(Desire, thing) is not None
 
     def believed_beliefs_of(self, other):
         """Returns a BeliefSet (not a Belief) that this Animate
@@ -401,7 +661,7 @@ class Animate(Actor):
         """
         assert isinstance(other, Animate)
         # for extra fun, try reading the code of this method out loud!
-        beliefs_belief = self.beliefs.get(BeliefsBelief(other))
+        beliefs_belief = self.beliefs.lookup(BeliefsBelief, other)
         if beliefs_belief is None:
             beliefs_belief = BeliefsBelief(other, BeliefSet())
             self.beliefs.add(beliefs_belief)
@@ -413,6 +673,8 @@ class Animate(Actor):
         if participants is None:
             participants = [self, other]
         other.topic = topic
+        if other.scheduler is not None:
+            other.scheduler.wake(other)
         self.emit(phrase, participants, speaker=self, addressed_to=other)
 
     def greet(self, other, phrase, participants=None):
@@ -424,44 +686,54 @@ class Animate(Actor):
     def question(self, other, phrase, participants=None, subject=None):
         self.address(other, QuestionTopic(self, subject=subject), phrase, participants)
 
+    def nap(self):
+        """Sleep through a few turns instead of taking them, if our
+        Scheduler lets us.  Return whether it did.
+
+        """
+        return self.scheduler is not None and self.scheduler.nap(self)
+
     ###--- generic actions ---###
 
     def place_in(self, location):
         """Like move_to but quieter.  For setting up scenes, etc.
 
         """
-        if self.location is not None:
-            self.location.contents.remove(self)
+        previous_location = self.location
+        if previous_location is not None:
+            previous_location.contents.remove(self)
         self.location = location
         self.location.contents.add(self)
+        if self.scheduler is not None:
+            self.scheduler.moved(self, previous_location)
         # this is needed so that the Editor knows where the character starts.
         # the Editor should (does?) strip out all instances of these that
         # aren't informative to the reader.
         self.emit("<1> <was-1> in <2>", [self, self.location])
         # a side-effect of the following code is, if they start in a location
         # with a horror,they don't react to it.  They probably should.
-        for x in self.location.contents:
+        for x in self.location.contents.notables:
             if x == self:
                 continue
-            if x.notable():
-                self.emit("<1> saw <2>", [self, x])
-                self.remember_location(x, self.location)
+            self.emit("<1> saw <2>", [self, x])
+            self.remember_location(x, self.location)
 
     def move_to(self, location):
         assert(location != self.location)
         assert(location is not None)
-        for x in self.location.contents:
+        for x in self.location.contents.animates:
             # otherwise we get "Bob saw Bob leave the room", eh?
             if x is self:
                 continue
-            if x.animate():
-                x.emit("<1> saw <2> leave the %s" % x.location.noun(), [x, self])
+            x.emit("<1> saw <2> leave the %s" % x.location.noun(), [x, self])
         if self.location is not None:
             self.location.contents.remove(self)
         previous_location = self.location
         self.location = location
         assert self not in self.location.contents
         self.location.contents.add(self)
+        if self.scheduler is not None:
+            self.scheduler.moved(self, previous_location)
         self.emit("<1> went to <2>", [self, self.location],
                   previous_location=previous_location)
 
@@ -474,39 +746,35 @@ class Animate(Actor):
         assert item.location == self
         self.emit("<1> pointed <3> at <2>",
             [self, other, item])
-        for actor in self.location.contents:
-            if actor.animate():
-                actor.remember_location(item, self)
+        for actor in self.location.contents.animates:
+            actor.remember_location(item, self)
 
     def put_down(self, item):
         assert(item.location == self)
         self.emit("<1> put down <2>", [self, item])
         item.move_to(self.location)
-        for actor in self.location.contents:
-            if actor.animate():
-                actor.remember_location(item, self.location)
+        for actor in self.location.contents.animates:
+            actor.remember_location(item, self.location)
 
     def pick_up(self, item):
         assert(item.location == self.location)
         self.emit("<1> picked up <2>", [self, item])
         item.move_to(self)
-        for actor in self.location.contents:
-            if actor.animate():
-                actor.remember_location(item, self)
+        for actor in self.location.contents.animates:
+            actor.remember_location(item, self)
 
     def give_to(self, other, item):
         assert(item.location == self)
         assert(self.location == other.location)
         self.emit("<1> gave <3> to <2>", [self, other, item])
         item.move_to(other)
-        for actor in self.location.contents:
-            if actor.animate():
-                actor.remember_location(item, other)
+        for actor in self.location.contents.animates:
+            actor.remember_location(item, other)
 
     def wander(self):
         self.move_to(
             self.location.exits[
-                random.randint(0, len(self.location.exits)-1)
+                self.random.randint(0, len(self.location.exits)-1)
             ]
         )
 
@@ -522,20 +790,22 @@ class Animate(Actor):
 
 
 class Male(MasculineMixin, ProperMixin, Animate):
-    pass
+    __slots__ = ()
 
 
 class Female(FeminineMixin, ProperMixin, Animate):
-    pass
+    __slots__ = ()
 
 
 ### LOCATIONS ###
 
 class Location(Actor):
+    __slots__ = ('exits', 'noun_')
+
     def __init__(self, name, enter="went to", noun="room", owner=None):
-        self.name = name
+        self._name = name
         self.enter = enter
-        self.contents = set()
+        self.contents = Contents()
         self.exits = []
         self.noun_ = noun
         self.owner = owner
@@ -550,39 +820,55 @@ class Location(Actor):
 
 
 class ProperLocation(ProperMixin, Location):
-    pass
+    __slots__ = ()
 
 
 ### OTHER INANIMATE OBJECTS ###
 
 class Item(Actor):
+    __slots__ = ()
+
     def takeable(self):
         return True
 
 
 class Weapon(Item):
+    __slots__ = ()
+
     def weapon(self):
         return True
 
 
 class Container(Actor):
+    __slots__ = ()
+
     def container(self):
         return True
 
 
 class ProperContainer(ProperMixin, Container):
-    pass
+    __slots__ = ()
 
 
 class Treasure(Item):
+    __slots__ = ()
+
     def treasure(self):
         return True
 
 
 class PluralTreasure(PluralMixin, Treasure):
-    pass
+    __slots__ = ()
 
 
 class Horror(Actor):
+    __slots__ = ()
+
     def horror(self):
         return True
+
+
+# at the bottom, like the events module's import of this one, so that
+# either module can be imported first: by the time the events module
+# wants Actor, it's here
+from swallows.engine.events import Event
@@ -0,0 +1,224 @@
+import heapq
+
+### SCHEDULERS ###
+
+# a Scheduler decides whose turn it is.  the Publisher makes one for each
+# chapter, and calls run() on it until the chapter has enough events (or,
+# when streaming, the collector calls step() whenever it runs dry.)
+#
+# each character is told what its scheduler is, so that it can be woken up
+# when someone addresses it (Animate.address calls wake()), so that it
+# can ask to take a nap (Animate.nap calls nap()) instead of yawning, and
+# so that the scheduler can tell when it moves (Animate.move_to and
+# place_in call moved()), for the sake of level of detail (see watch().)
+
+class SchedulerStats(object):
+    """How the Schedulers of a Publisher spent their time, all told."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.turns = 0          # calls to live()
+        self.wakeups = 0        # turns given out of order, to answer someone
+        self.naps = 0
+        self.ticks_napped = 0   # turns that naps saved us
+        self.trimmed = 0        # events dropped to hit the budget exactly
+
+    def __str__(self):
+        return ("scheduling: %d turns, %d wakeups, %d naps "
+                "(%d ticks napped), %d events trimmed" % (
+            self.turns, self.wakeups, self.naps, self.ticks_napped,
+            self.trimmed
+        ))
+
+
+class Scheduler(object):
+    """Base class for Schedulers.  Subclasses implement step(), which
+    gives one or more characters a turn.
+
+    """
+    # whether run() should drop whatever events the last turn made beyond
+    # the budget.  only the events are dropped: whatever the turn did to
+    # the world (moving, picking things up, learning things) still stands,
+    # just as it does for all the other events the reader never sees.
+    exact = False
+
+    def __init__(self, characters, stats=None):
+        self.characters = characters
+        if stats is None:
+            stats = SchedulerStats()
+        self.stats = stats
+        for character in characters:
+            character.scheduler = self
+        # with level of detail, maps each location that has a main
+        # character in it to how many of them there are
+        self.watchers = None
+        self.main_characters = frozenset()
+        self.collector = None
+
+    def step(self):
+        raise NotImplementedError
+
+    def wake(self, character):
+        """Called when the character has been given a topic."""
+        pass
+
+    def nap(self, character):
+        """Called when the character would like to sleep for a while.
+        Return whether it may.
+
+        """
+        return False
+
+    def watch(self, main_characters, collector):
+        """Turn on level of detail.  From now on, only the characters who
+        are where some main character is get the collector.  The others
+        still take their turns as usual -- so they still move things
+        around, and learn things -- but they don't make any Events, which
+        the Editor would only throw away.  A character gets the collector
+        back as soon as it, or a main character, arrives where the other is.
+
+        """
+        self.main_characters = frozenset(main_characters)
+        self.collector = collector
+        self.watchers = {}
+        for character in self.main_characters:
+            location = character.location
+            if location is not None:
+                self.watchers[location] = self.watchers.get(location, 0) + 1
+        for character in self.characters:
+            self.update_detail(character)
+
+    def update_detail(self, character):
+        if character.location in self.watchers:
+            character.collector = self.collector
+        else:
+            character.collector = None
+
+    def moved(self, character, previous_location):
+        """Called when a character has moved, or been placed somewhere."""
+        watchers = self.watchers
+        if watchers is None:
+            return
+        if character not in self.main_characters:
+            self.update_detail(character)
+            return
+        if previous_location is not None:
+            n = watchers[previous_location] - 1
+            if n:
+                watchers[previous_location] = n
+            else:
+                # nobody is watching there anymore
+                del watchers[previous_location]
+                for x in previous_location.contents.animates:
+                    if x.scheduler is self:
+                        self.update_detail(x)
+        location = character.location
+        if location in watchers:
+            watchers[location] += 1
+        else:
+            watchers[location] = 1
+            for x in location.contents.animates:
+                if x.scheduler is self:
+                    self.update_detail(x)
+
+    def run(self, collector, num_events):
+        """Give out turns until the collector has num_events events.  A
+        turn can't be stopped halfway through, so the last one may make a
+        few more; if we are exact, those are dropped from the collector
+        (but not undone; see exact.)
+
+        """
+        while collector.num_collected < num_events:
+            self.step()
+        if self.exact:
+            self.stats.trimmed += collector.truncate(num_events)
+
+
+class RoundRobinScheduler(Scheduler):
+    """Every character takes a turn, in order, whether or not it has
+    anything to do.  This is how The Swallows has always been told, so
+    it's the default; it may overshoot the budget by up to a round.
+
+    """
+    def step(self):
+        if self.watchers is None:
+            for character in self.characters:
+                character.live()
+        else:
+            # the turns in between may have gone unseen, so the last event
+            # may well have been this character's too
+            collector = self.collector
+            for character in self.characters:
+                collector.end_turn()
+                character.live()
+        self.stats.turns += len(self.characters)
+
+
+class PriorityScheduler(Scheduler):
+    """Characters take their turns off a priority queue, ordered by the
+    tick they are due, then by priority, then by when they were queued.
+    Ordinarily a character is due again the tick after its turn, so that
+    each tick is a round; but a character who has been addressed is due
+    right away, ahead of everyone else, and a character who naps isn't
+    due for another 1 to max_nap ticks, and isn't called at all until then.
+
+    The budget is hit exactly, by dropping the events the last turn made
+    beyond it.  So the chapter may end halfway through someone's turn,
+    and the next chapter starts from where the whole turn left things:
+    if it was "Bob yawned.  Bob went to the kitchen." and the budget ran
+    out after the yawn, Bob is in the kitchen, though nobody read that
+    he went there.  (The next chapter places everyone anew anyway.)
+
+    """
+    exact = True
+
+    URGENT = 0
+    NORMAL = 1
+
+    def __init__(self, characters, stats=None, max_nap=8):
+        Scheduler.__init__(self, characters, stats=stats)
+        self.max_nap = max_nap
+        self.queue = []
+        # the entry in the queue that is actually in force for each
+        # character; any others are stale, and skipped
+        self.due = {}
+        self.num_queued = 0
+        self.now = 0
+        self.nap_for = 0
+        for character in characters:
+            self.schedule(character, 0, self.NORMAL)
+
+    def schedule(self, character, tick, priority):
+        self.due[character] = self.num_queued
+        heapq.heappush(self.queue,
+                       (tick, priority, self.num_queued, character))
+        self.num_queued += 1
+
+    def step(self):
+        queue = self.queue
+        due = self.due
+        while True:
+            (tick, priority, n, character) = heapq.heappop(queue)
+            if due[character] == n:
+                break
+        self.now = tick
+        self.nap_for = 0
+        if priority == self.URGENT:
+            self.stats.wakeups += 1
+        # everyone else may be asleep, so this character may have had the
+        # last turn too, and may well do the same thing again
+        if character.collector:
+            character.collector.end_turn()
+        character.live()
+        self.stats.turns += 1
+        self.schedule(character, tick + 1 + self.nap_for, self.NORMAL)
+
+    def wake(self, character):
+        self.schedule(character, self.now, self.URGENT)
+
+    def nap(self, character):
+        self.nap_for = character.random.randint(1, self.max_nap)
+        self.stats.naps += 1
+        self.stats.ticks_napped += self.nap_for
+        return True
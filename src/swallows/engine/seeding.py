@@ -0,0 +1,69 @@
+import hashlib
+import random
+
+### RANDOM NUMBER STREAMS ###
+
+# so that a story can be told the same way twice, everything that makes
+# random choices can be given its own random.Random, all of which are
+# derived from a single master seed.  each one is named by a path, like
+# ('chapter', 3, 'character', 'Alice'), so it doesn't matter in which
+# order (or in which process) the streams are created and used.
+
+def derive_seed(seed, *path):
+    """Return a seed for the stream with the given path, derived from
+    the given master seed.
+
+    """
+    key = '/'.join([str(seed)] + [str(part) for part in path])
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    return int(hashlib.md5(key).hexdigest()[:16], 16)
+
+
+class Stream(random.Random):
+    """A random.Random which makes the same choices, from the same seed,
+    under Python 2 and Python 3.  (Python 3 generates the same random
+    numbers, but turns them into choices differently; these are the ways
+    Python 2 did it, for the small ranges we ask for.)
+
+    """
+    def randrange(self, start, stop=None):
+        if stop is None:
+            (start, stop) = (0, start)
+        width = stop - start
+        if width <= 0:
+            raise ValueError("empty range for randrange() (%d, %d)" %
+                             (start, stop))
+        return start + int(self.random() * width)
+
+    def randint(self, a, b):
+        return self.randrange(a, b + 1)
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def shuffle(self, x):
+        for i in reversed(range(1, len(x))):
+            j = int(self.random() * (i + 1))
+            x[i], x[j] = x[j], x[i]
+
+
+def stream(seed, *path):
+    """Return a new Stream for the given path."""
+    return Stream(derive_seed(seed, *path))
+
+
+class GlobalRandom(object):
+    """Stands in for the random module itself, for things that haven't
+    been given a stream of their own.  Unlike the random module, it
+    can be pickled along with the rest of the world.
+
+    """
+    def __getattr__(self, name):
+        return getattr(random, name)
+
+    def __reduce__(self):
+        return 'global_random'
+
+
+global_random = GlobalRandom()
@@ -0,0 +1,142 @@
+import gzip
+import sys
+import zlib
+try:
+    from StringIO import StringIO
+except ImportError:  # Python 3
+    from io import StringIO
+
+### OUTPUT SINKS ###
+
+# a Sink is where the Publisher (and its Editor) write the novel to.
+# Sinks collect what is written to them into a buffer, and only hand it
+# to the underlying stream in large chunks.  They also keep count of how
+# much has been written, so you can tell whether it's long enough to
+# qualify for NaNoGenMo.  (What they count is characters of text, before
+# it's encoded or compressed, not the size of the file it ends up in.)
+
+class Sink(object):
+    def __init__(self, stream, buffer_size=65536):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.chars_written = 0
+        self.words_written = 0
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        self.chars_written += len(text)
+        self.words_written += len(text.split())
+        if self.buffered >= self.buffer_size:
+            self.drain()
+
+    def drain(self):
+        """Hand everything buffered so far to the underlying stream."""
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+
+    def flush(self):
+        self.drain()
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+    def resume(self, chars_written, words_written):
+        """Carry on from where an earlier Sink, which had written so much
+        of the same novel before it was stopped, left off.  (Here, that
+        only means taking up its counts; it's up to you to see that what
+        it wrote is already in the stream.)
+
+        """
+        self.buffer = []
+        self.buffered = 0
+        self.chars_written = chars_written
+        self.words_written = words_written
+
+    def __str__(self):
+        return "%d characters, %d words" % (self.chars_written,
+                                            self.words_written)
+
+
+class StreamSink(Sink):
+    """Writes to an already-open file-like object (by default, standard
+    output), which it leaves open when it is closed.
+
+    """
+    def __init__(self, stream=None, buffer_size=65536):
+        if stream is None:
+            stream = sys.stdout
+        Sink.__init__(self, stream, buffer_size=buffer_size)
+
+
+class FileSink(Sink):
+    """Writes to a file of the given name.  If resuming is true, the file
+    is left alone until resume() is called, which is how to pick up a
+    novel that a Publisher was stopped in the middle of.
+
+    """
+    def __init__(self, filename, buffer_size=65536, resuming=False):
+        self.filename = filename
+        stream = None
+        if not resuming:
+            stream = self.open(filename)
+        Sink.__init__(self, stream, buffer_size=buffer_size)
+
+    def open(self, filename):
+        return open(filename, 'w')
+
+    def read(self, size):
+        """Return the first size characters of what is in the file."""
+        with open(self.filename, 'r') as f:
+            return f.read(size)
+
+    def close(self):
+        Sink.close(self)
+        self.stream.close()
+
+    def resume(self, chars_written, words_written):
+        # keep only what had been written by then; anything after that
+        # is from a chapter that never got finished
+        Sink.resume(self, chars_written, words_written)
+        text = ''
+        if chars_written:
+            text = self.read(chars_written)
+        if len(text) < chars_written:
+            raise ValueError('%s should already have %d characters in it, '
+                             'but only has %d' % (self.filename,
+                                                  chars_written, len(text)))
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = self.open(self.filename)
+        self.stream.write(text)
+
+
+class GzipSink(FileSink):
+    def open(self, filename):
+        if sys.version_info[0] >= 3:
+            return gzip.open(filename, 'wt')
+        return gzip.open(filename, 'wb')
+
+    def read(self, size):
+        # if we were stopped, the file was never properly finished, which
+        # gzip.open() would complain about; zlib doesn't mind
+        with open(self.filename, 'rb') as f:
+            data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(f.read())
+        if not isinstance(data, str):
+            data = data.decode('utf-8')
+        return data[:size]
+
+
+class MemorySink(Sink):
+    """Keeps the novel in memory.  getvalue() returns all of it."""
+    def __init__(self, buffer_size=65536):
+        Sink.__init__(self, StringIO(), buffer_size=buffer_size)
+
+    def getvalue(self):
+        self.drain()
+        return self.stream.getvalue()
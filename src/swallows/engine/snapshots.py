@@ -0,0 +1,179 @@
+from io import BytesIO
+import os
+try:
+    import cPickle as pickle
+except ImportError:  # Python 3
+    import pickle
+
+### SNAPSHOTS ###
+
+# a snapshot is a copy of some objects (the world, say), written to a file,
+# from which they can be brought back later, or in another process.
+#
+# pickling a world in the usual way follows exits, contents, beliefs and
+# so on recursively, so a big world needs a big recursion limit, and a lot
+# of stack.  so a snapshot is flat instead: every Actor gets a number, and
+# wherever one Actor refers to another, only that number is written (as a
+# pickle "persistent id".)  each Actor's own state is then written on its
+# own, one after the other, each referring to the others by number.  it
+# looks like this:
+#
+#   SNAPSHOT_MAGIC
+#   the objects, pickled, with each Actor in them replaced by a number
+#   the state of Actor 0, as a dict of its attributes, pickled likewise
+#   the state of Actor 1
+#   ...and so on, for every Actor that any of the above referred to.
+#
+# the pickles all share one memo, so anything (a Belief, a Topic) that
+# several Actors refer to is only written once, and comes back only once.
+#
+# EventCollectors and Schedulers are left out, and come back as None;
+# a character is given new ones at the start of each chapter anyway.
+
+SNAPSHOT_MAGIC = b'SWALLOWS-SNAPSHOT\x01'
+# the highest protocol both Python 2 and Python 3 can read, so that a
+# snapshot made by either can be restored by the other
+SNAPSHOT_PROTOCOL = 2
+
+
+def snapshot_classes():
+    """Return (the class of objects that are written flat, the classes of
+    objects that are left out.)
+
+    """
+    # not imported at the top of this module, since the events module
+    # imports this one, and the objects module imports that one
+    from swallows.engine.events import EventCollector
+    from swallows.engine.objects import Actor
+    from swallows.engine.scheduling import Scheduler
+    return (Actor, (EventCollector, Scheduler))
+
+
+# class -> the names of all the slots its instances have
+slot_names_of_class = {}
+
+
+def slot_names(cls):
+    names = slot_names_of_class.get(cls)
+    if names is None:
+        names = []
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend(name for name in slots
+                         if name not in ('__dict__', '__weakref__'))
+        slot_names_of_class[cls] = names
+    return names
+
+
+def state_of(actor):
+    state = {}
+    for name in slot_names(actor.__class__):
+        try:
+            state[name] = getattr(actor, name)
+        except AttributeError:
+            # a slot that was never set, like a Location's location
+            pass
+    state.update(getattr(actor, '__dict__', {}))
+    return state
+
+
+def dump_snapshot(obj, f, state=state_of):
+    """Write a snapshot of obj, and everything it refers to, to the file
+    f (opened in binary mode.)  What is saved of each Actor is what state
+    returns for it: by default, all of its attributes.
+
+    """
+    (flat_class, left_out) = snapshot_classes()
+    # the Actors in the order they were numbered, and their numbers
+    actors = []
+    numbers = {}
+
+    def persistent_id(x):
+        if isinstance(x, flat_class):
+            n = numbers.get(id(x))
+            if n is None:
+                n = numbers[id(x)] = len(actors)
+                actors.append(x)
+            # the class comes along, so that an Actor can be made before
+            # its state has been read
+            return (n, x.__class__)
+        if isinstance(x, left_out):
+            return 'none'
+        return None
+
+    f.write(SNAPSHOT_MAGIC)
+    pickler = pickle.Pickler(f, SNAPSHOT_PROTOCOL)
+    pickler.persistent_id = persistent_id
+    pickler.dump(obj)
+    n = 0
+    while n < len(actors):
+        pickler.dump(state(actors[n]))
+        n += 1
+
+
+def load_snapshot(f):
+    """Read a snapshot from the file f (opened in binary mode), and return
+    the object it is a snapshot of.
+
+    """
+    if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise ValueError('%s is not a snapshot' % getattr(f, 'name', f))
+    actors = []
+
+    def persistent_load(id):
+        if id == 'none':
+            return None
+        (n, cls) = id
+        if n == len(actors):
+            actors.append(cls.__new__(cls))
+        return actors[n]
+
+    unpickler = pickle.Unpickler(f)
+    unpickler.persistent_load = persistent_load
+    obj = unpickler.load()
+    # every Actor numbered so far has its state still to come, in order,
+    # and reading those may number some more
+    n = 0
+    while n < len(actors):
+        actor = actors[n]
+        for (name, value) in unpickler.load().items():
+            setattr(actor, name, value)
+        n += 1
+    return obj
+
+
+def dumps_snapshot(obj):
+    """Return a snapshot of obj as bytes, to be sent to another process,
+    say.
+
+    """
+    f = BytesIO()
+    dump_snapshot(obj, f)
+    return f.getvalue()
+
+
+def loads_snapshot(data):
+    """Return the object of which data is a snapshot."""
+    return load_snapshot(BytesIO(data))
+
+
+def save_snapshot(obj, filename):
+    """Write a snapshot of obj to the given file.  The file is only
+    replaced once the snapshot is complete, so if we are stopped halfway
+    through, the last snapshot is still there.
+
+    """
+    temporary = '%s.%d' % (filename, os.getpid())
+    with open(temporary, 'wb') as f:
+        dump_snapshot(obj, f)
+    if os.name == 'nt' and os.path.exists(filename):
+        os.remove(filename)
+    os.rename(temporary, filename)
+
+
+def restore_snapshot(filename):
+    """Return the object of which a snapshot was saved in the given file."""
+    with open(filename, 'rb') as f:
+        return load_snapshot(f)
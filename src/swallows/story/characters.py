@@ -18,7 +18,6 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
-import random
 import sys
 
 from swallows.engine.objects import (
@@ -55,25 +54,27 @@ from swallows.engine.objects import (
 ### some Swallows-specific topics (sort of)
 
 class WhereQuestionTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class ThreatGiveMeTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class ThreatTellMeTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 class ThreatAgreeTopic(Topic):
-    pass
+    __slots__ = ()
 
 
 ### some Swallows-specific beliefs
 
 class SuspicionOfHiding(Belief):
     """This character suspects some other character of hiding this thing."""
+    __slots__ = ()
+
     def __str__(self):
         return "I think someone hid %s" % (
             self.subject.render()
@@ -83,6 +84,8 @@ class SuspicionOfHiding(Belief):
 ### Base character personalities for The Swallows
 
 class Character(Animate):
+    __slots__ = ('nerves', 'revolver', 'brandy', 'dead_body')
+
     def __init__(self, name, location=None, collector=None):
         """Constructor specific to characters.  In it, we set up some
         Swallows-specific properties ('nerves').
@@ -106,31 +109,31 @@ class Character(Animate):
         # we override this method of Animate in order to also remove
         # our suspicion that the item has been hidden.  'cos we found it.
         Animate.believe_location(self, thing, location, informant=informant, concealer=concealer)
-        self.beliefs.remove(SuspicionOfHiding(thing))
+        self.beliefs.discard(SuspicionOfHiding, thing)
 
     def move_to(self, location):
         """Override some behaviour upon moving to a new location.
 
         """
         Animate.move_to(self, location)
-        if random.randint(0, 10) == 0:
+        if self.random.randint(0, 10) == 0:
             self.emit("It was so nice being in <2> again",
              [self, self.location], excl=True)
         
         # okay, look around you.
-        for x in self.location.contents:
+        for x in self.location.contents.notables:
             assert x.location == self.location
             if x == self:
                 continue
             if x.horror():
                 belief = self.recall_location(x)
                 if belief:
-                    amount = random.choice(['shudder', 'wave'])
-                    emotion = random.choice(['fear', 'disgust', 'sickness', 'loathing'])
+                    amount = self.random.choice(['shudder', 'wave'])
+                    emotion = self.random.choice(['fear', 'disgust', 'sickness', 'loathing'])
                     self.emit("<1> felt a %s of %s as <he-1> looked at <2>" % (amount, emotion), [self, x])
                     self.remember_location(x, self.location)
                 else:
-                    verb = random.choice(['screamed', 'yelped', 'went pale'])
+                    verb = self.random.choice(['screamed', 'yelped', 'went pale'])
                     self.emit("<1> %s at the sight of <indef-2>" % verb, [self, x], excl=True)
                     self.remember_location(x, self.location)
                     self.nerves = 'shaken'
@@ -159,11 +162,11 @@ class Character(Animate):
                 for suspicion in suspicions:
                     if not suspicion.subject.treasure():
                         continue
-                    if self.beliefs.get(ItemLocation(suspicion.subject)):
+                    if self.beliefs.lookup(ItemLocation, suspicion.subject):
                         continue
                     actionable_suspicions.append(suspicion)
                 if actionable_suspicions and self.revolver.location == self:
-                    suspicion = random.choice(actionable_suspicions)
+                    suspicion = self.random.choice(actionable_suspicions)
                     self.point_at(other, self.revolver)
                     self.address(other,
                         ThreatTellMeTopic(self, subject=suspicion.subject),
@@ -184,7 +187,7 @@ class Character(Animate):
 
         # otherwise, if there are items here that you desire, you *must* pick
         # them up.
-        for x in self.location.contents:
+        for x in self.location.contents.takeables:
             if self.does_desire(x):
                 self.pick_up(x)
                 return
@@ -197,21 +200,21 @@ class Character(Animate):
             if y.treasure():
                 fixated_on = y
                 break
-        if not fixated_on and random.randint(0, 20) == 0 and self.revolver.location == self:
+        if not fixated_on and self.random.randint(0, 20) == 0 and self.revolver.location == self:
             fixated_on = self.revolver
 
         # check if you are alone
-        for x in self.location.contents:
-            if x.animate() and x is not self:
-                people_about = True
+        if len(self.location.contents.animates) > 1:
+            people_about = True
 
-        choice = random.randint(0, 25)
+        choice = self.random.randint(0, 25)
         if choice < 10 and not people_about:
             return self.hide_and_seek(fixated_on)
         if choice < 20:
             return self.wander()
         if choice == 20:
-            self.emit("<1> yawned", [self])
+            if not self.nap():
+                self.emit("<1> yawned", [self])
         elif choice == 21:
             self.emit("<1> gazed thoughtfully into the distance", [self])
         elif choice == 22:
@@ -230,22 +233,17 @@ class Character(Animate):
     def hide_and_seek(self, fixated_on):
         # check for some place to hide the thing you're fixating on
         containers = []
-        for container in self.location.contents:
-            if container.container():
-                # did I hide something here previously?
-                beliefs_about_container = []
-                for thing in self.beliefs.subjects():
-                    belief = self.recall_location(thing)
-                    if belief and belief.location == container:
-                        beliefs_about_container.append(belief)
-                containers.append((container, beliefs_about_container))
+        for container in self.location.contents.containers:
+            # did I hide something here previously?
+            beliefs_about_container = self.beliefs.beliefs_located_at(container)
+            containers.append((container, beliefs_about_container))
         if not containers:
             # ? ... maybe this should be the responsibility of the caller
             return self.wander()
         # ok!  we now have a list of containers, each of which has zero or
         # more beliefs of things being in it.
         if fixated_on:
-            (container, beliefs) = random.choice(containers)
+            (container, beliefs) = self.random.choice(containers)
             self.emit("<1> hid <2> in <3>", [self, fixated_on, container])
             fixated_on.move_to(container)
             self.remember_location(fixated_on, container, concealer=self)
@@ -253,15 +251,15 @@ class Character(Animate):
         else:
             # we're looking for treasure!
             # todo: it would maybe be better to prioritize this selection
-            (container, beliefs) = random.choice(containers)
+            (container, beliefs) = self.random.choice(containers)
             # sometimes, we don't care what we think we know about something
             # (this lets us, for example, explore things in hopes of brandy)
-            if beliefs and random.randint(0, 3) == 0:
+            if beliefs and self.random.randint(0, 3) == 0:
                 beliefs = None
             if beliefs:
-                belief = random.choice(beliefs)
+                belief = self.random.choice(beliefs)
                 thing = belief.subject
-                picking_up = random.randint(0, 5) == 0
+                picking_up = self.random.randint(0, 5) == 0
                 if thing is self.revolver:
                     picking_up = True
                 if picking_up:
@@ -300,7 +298,7 @@ class Character(Animate):
                     if self.does_desire(thing):
                         desired_things.append(thing)
                 if desired_things:
-                    thing = random.choice(desired_things)
+                    thing = self.random.choice(desired_things)
                     self.emit("<1> found <2> there, and took <him-2>",
                               [self, thing, container], exciting=True)
                     thing.move_to(self)
@@ -340,7 +338,7 @@ class Character(Animate):
             self.speak_to(other,
                "'You make a persuasive case for remaining undecided, <2>,' said <1>",
                [self, other])
-            self.beliefs.remove(Goal(topic.subject))
+            self.beliefs.discard(Goal, topic.subject)
             # update other's BeliefsBelief about self to no longer
             # contain this Goal
             other.believed_beliefs_of(self).remove(Goal(topic.subject))
@@ -358,14 +356,14 @@ class Character(Animate):
                     self.remember_location(x, other)
                     self.speak_to(other, "'I see you are carrying <indef-3>,' said <1>", [self, other, x])
                     return
-            choice = random.randint(0, 3)
+            choice = self.random.randint(0, 3)
             if choice == 0:
                 self.question(other, "'Lovely weather we're having, isn't it?' asked <1>")
             if choice == 1:
                 self.speak_to(other, "'I was wondering where you were,' said <1>")
         elif isinstance(topic, QuestionTopic):
             if topic.subject is not None:
-                choice = random.randint(0, 1)
+                choice = self.random.randint(0, 1)
                 if choice == 0:
                     self.speak_to(other, "'I know nothing about <3>, <2>,' explained <1>",
                        [self, other, topic.subject])
@@ -401,7 +399,7 @@ class Character(Animate):
                     topic.subject, belief.location, informant=self
                 )
         elif isinstance(topic, SpeechTopic):
-            choice = random.randint(0, 5)
+            choice = self.random.randint(0, 5)
             if choice == 0:
                 self.emit("<1> nodded", [self])
             if choice == 1:
@@ -414,7 +412,7 @@ class Character(Animate):
                 self.speak_to(other, "'Oh, I know, I know,' said <1>")
             if choice == 5:
                 # -- this is getting really annoying.  disable for now. --
-                # item = random.choice(ALL_ITEMS)
+                # item = self.random.choice(ALL_ITEMS)
                 # self.question(other, "'But what about <3>, <2>?' posed <1>",
                 #    [self, other, item], subject=item)
                 self.speak_to(other, "'I see, <2>, I see,' said <1>")
@@ -429,7 +427,7 @@ class Character(Animate):
 
         # what do I believe the other believes about it?
         other_beliefs = self.believed_beliefs_of(other)
-        other_memory = other_beliefs.get(self_memory)
+        other_memory = other_beliefs.lookup(ItemLocation, self_memory.subject)
         
         if not other_memory:
             self.question(other,
@@ -440,7 +438,7 @@ class Character(Animate):
             other.believed_beliefs_of(self).add(self_memory)
             return
         else:
-            choice = random.randint(0, 2)
+            choice = self.random.randint(0, 2)
             if choice == 0:
                 self.question(other, "'Do you think we should do something about <3>?' asked <1>",
                     [self, other, self_memory.subject])
@@ -465,7 +463,7 @@ class Character(Animate):
                             [self, other, self_memory.subject],
                             subject=self.brandy)
                         self.desire(self.brandy)
-                        if random.randint(0, 1) == 0:
+                        if self.random.randint(0, 1) == 0:
                             self.address(other, WhereQuestionTopic(self, subject=self.brandy),
                                 "'Where did you say <3> was?'",
                                 [self, other, self.brandy])
@@ -480,20 +478,20 @@ class Character(Animate):
         # this should probably be affected by whether this
         # character has, oh, i don't know, put the other at
         # gunpoint yet, or not, or something
-        my_goal = self.beliefs.get(Goal(thing))
+        my_goal = self.beliefs.lookup(Goal, thing)
         if my_goal is None:
-            if random.randint(0, 1) == 0:
+            if self.random.randint(0, 1) == 0:
                 self.beliefs.add(Goal(thing, 'call the police about'))
             else:
                 self.beliefs.add(Goal(thing, 'try to dispose of'))
-        my_goal = self.beliefs.get(Goal(thing))
+        my_goal = self.beliefs.lookup(Goal, thing)
         assert my_goal is not None
 
         # here's where it gets a bit gnarly.
         # what do I believe the other believes?
         other_beliefs = self.believed_beliefs_of(other)
         # more specifically, what are their goals regarding the thing?
-        other_goal = other_beliefs.get(Goal(thing))
+        other_goal = other_beliefs.lookup(Goal, thing)
 
         # they don't have one yet.  tell them ours.
         if other_goal is None:
@@ -529,8 +527,8 @@ class Character(Animate):
 
 
 class MaleCharacter(MasculineMixin, ProperMixin, Character):
-    pass
+    __slots__ = ()
 
 
 class FemaleCharacter(FeminineMixin, ProperMixin, Character):
-    pass
+    __slots__ = ()
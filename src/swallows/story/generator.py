@@ -0,0 +1,223 @@
+# Copyright (c)2013 Chris Pressey, Cat's Eye Technologies
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+#
+# generator.py: worlds much bigger than the house in world.py, made up
+# on the spot, for seeing how the engine copes with thousands of rooms and
+# dozens of characters.  the same parameters and the same seed always
+# make the same world.
+#
+
+from swallows.engine.objects import (
+    Location, ProperLocation, Treasure, PluralTreasure,
+    Container, ProperContainer,
+    Item, Weapon, Horror
+)
+from swallows.engine.seeding import stream
+from swallows.story.characters import MaleCharacter, FemaleCharacter
+
+ROOMS = (
+    'kitchen', 'living room', 'dining room', 'hall', 'study', 'bathroom',
+    'library', 'parlour', 'pantry', 'conservatory', 'billiard room',
+    'ballroom', 'drawing room', 'sitting room', 'laundry', 'nursery',
+    'attic', 'cellar', 'gallery', 'music room', 'lounge', 'den',
+)
+ADJECTIVES = (
+    'north', 'south', 'east', 'west', 'upper', 'lower', 'old', 'new',
+    'little', 'grand', 'blue', 'green', 'red', 'yellow', 'dusty', 'long',
+)
+CONTAINERS = (
+    'cupboard', 'wardrobe', 'chest', 'desk', 'bureau', 'sideboard',
+    'filing cabinet', 'trunk', 'dresser', 'bookcase',
+)
+TREASURES = (
+    'golden falcon', 'jade idol', 'silver chalice', 'ruby ring',
+    'pearl necklace', 'ivory statuette', 'gold watch', 'crystal skull',
+)
+PLURAL_TREASURES = (
+    'stolen jewels', 'bearer bonds', 'rare stamps', 'gold coins',
+)
+ITEMS = (
+    'umbrella', 'candlestick', 'ashtray', 'newspaper', 'teapot',
+    'lamp', 'typewriter', 'ledger', 'hat', 'telescope',
+)
+MALE_NAMES = (
+    'Bob', 'Fred', 'Arthur', 'Cecil', 'Edgar', 'Harold', 'Jasper',
+    'Lionel', 'Nigel', 'Percy', 'Rupert', 'Walter',
+)
+FEMALE_NAMES = (
+    'Alice', 'Beatrice', 'Clara', 'Daphne', 'Edith', 'Florence',
+    'Gwendolyn', 'Harriet', 'Ida', 'Mabel', 'Violet', 'Winifred',
+)
+SURNAMES = (
+    'Ashby', 'Blackwood', 'Carlisle', 'Drummond', 'Fairfax', 'Hawkins',
+    'Lockwood', 'Marsh', 'Pemberton', 'Thorne', 'Vance', 'Whitlock',
+)
+
+
+class World(object):
+    """A generated world.  characters and setting are what a Publisher
+    wants; the other attributes are there in case you want to poke at them.
+
+    """
+    def __init__(self, characters, setting, containers, items,
+                 revolver, brandy, dead_body):
+        self.characters = characters
+        self.setting = setting
+        self.containers = containers
+        self.items = items
+        self.revolver = revolver
+        self.brandy = brandy
+        self.dead_body = dead_body
+
+
+def unique_names(rng, words, count, qualify, seen=None):
+    """Return count different names picked from words.  When a name has
+    already been used, qualify it (e.g. "blue study" or "Bob Hawkins"),
+    and, when we run out of those, number it.
+
+    """
+    if seen is None:
+        seen = set()
+    names = []
+    while len(names) < count:
+        word = rng.choice(words)
+        name = word
+        if name in seen:
+            name = qualify(word, rng)
+        n = 2
+        while name in seen:
+            name = '%s %d' % (word, n)
+            n += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def adjective(word, rng):
+    return '%s %s' % (rng.choice(ADJECTIVES), word)
+
+
+def surname(word, rng):
+    return '%s %s' % (word, rng.choice(SURNAMES))
+
+
+def connect(rng, locations, degree):
+    """Give the locations exits, so that every location can be reached
+    from every other, and the average location has about degree exits.
+
+    """
+    exits = [[] for location in locations]
+
+    def link(a, b):
+        exits[a].append(locations[b])
+        exits[b].append(locations[a])
+
+    # first a random spanning tree, so everything is connected...
+    for n in range(1, len(locations)):
+        link(n, rng.randrange(n))
+    # ...then extra corridors until we have enough of them
+    wanted = (len(locations) * degree) // 2
+    corridors = len(locations) - 1
+    attempts = 0
+    while corridors < wanted and attempts < wanted * 10:
+        attempts += 1
+        a = rng.randrange(len(locations))
+        b = rng.randrange(len(locations))
+        if a == b or locations[b] in exits[a]:
+            continue
+        link(a, b)
+        corridors += 1
+
+    for (location, its_exits) in zip(locations, exits):
+        location.set_exits(*its_exits)
+
+
+def generate_world(locations=100, degree=3, containers_per_room=1,
+                   characters=2, items=20, seed=0):
+    """Make a new World with the given number of locations (not counting
+    each character's bedroom), connected so that each has about degree
+    exits, with containers_per_room containers in the average room,
+    the given number of characters, and the given number of items
+    besides the revolver, the brandy, and the dead body.
+
+    """
+    assert locations >= 1 and characters >= 1
+    rng = stream(seed, 'generator')
+
+    # the cast
+    cast = []
+    seen = set()
+    for n in range(characters):
+        if rng.random() < 0.5:
+            (name,) = unique_names(rng, MALE_NAMES, 1, surname, seen)
+            cast.append(MaleCharacter(name))
+        else:
+            (name,) = unique_names(rng, FEMALE_NAMES, 1, surname, seen)
+            cast.append(FemaleCharacter(name))
+
+    # the rooms, plus a bedroom with a bed for each character
+    setting = [Location(name) for name in
+               unique_names(rng, ROOMS, locations, adjective)]
+    beds = []
+    for character in cast:
+        bedroom = ProperLocation("<*> bedroom", owner=character)
+        beds.append(ProperContainer("<*> bed", location=bedroom,
+                                    owner=character))
+        setting.append(bedroom)
+    rng.shuffle(setting)
+    connect(rng, setting, degree)
+
+    # furniture
+    containers = list(beds)
+    for name in unique_names(rng, CONTAINERS,
+                             int(locations * containers_per_room), adjective):
+        containers.append(Container(name, location=rng.choice(setting)))
+
+    # things to find, fight over, and be horrified by.  items go in a
+    # container about half of the time.
+    def somewhere():
+        if containers and rng.random() < 0.5:
+            return rng.choice(containers)
+        return rng.choice(setting)
+
+    revolver = Weapon('revolver', location=rng.choice(beds))
+    brandy = Item('bottle of brandy', location=somewhere())
+    dead_body = Horror('dead body', location=rng.choice(setting))
+    things = [revolver, brandy]
+    seen = set()
+    for n in range(items):
+        (class_, words) = rng.choice((
+            (Treasure, TREASURES),
+            (PluralTreasure, PLURAL_TREASURES),
+            (Item, ITEMS),
+        ))
+        (name,) = unique_names(rng, words, 1, adjective, seen)
+        things.append(class_(name, location=somewhere()))
+
+    for character in cast:
+        character.configure_objects(
+            revolver=revolver,
+            brandy=brandy,
+            dead_body=dead_body,
+        )
+
+    return World(tuple(cast), tuple(setting), tuple(containers),
+                 tuple(things), revolver, brandy, dead_body)
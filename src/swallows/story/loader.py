@@ -0,0 +1,365 @@
+# Copyright (c)2013 Chris Pressey, Cat's Eye Technologies
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+#
+# loader.py: worlds described in data files, instead of in code, so that
+# as many fresh copies of a world as you like can be made, on demand.
+#
+# a world definition is a JSON file holding three lists: "characters",
+# "locations" and "things" (see house.json, the house of The Swallows.)
+# each entry has an "id", by which other entries refer to it, a "name",
+# and a "class" (locations are Locations unless they say otherwise.)
+# besides those,
+#
+#   a character may have "objects": the important objects it recognizes,
+#     as given to configure_objects();
+#   a location may have a "noun", an "enter" and an "owner", and ought to
+#     have "exits": the locations it leads to;
+#   a thing must have a "location" (a location, or a thing listed before
+#     it) and may have an "owner".  the location may be a list instead, in
+#     which case one of them is picked each time a world is made.
+#
+# a class is the name of a class in swallows.story.characters or
+# swallows.engine.objects, or a dotted path to a class anywhere else.
+# things are put in their locations in the order they are listed, and the
+# setting is the locations in the order they are listed, so both matter.
+#
+# making a world from its definition means parsing JSON and running a lot
+# of constructors, so it's only done once.  the world is then saved as a
+# snapshot (see swallows.engine.snapshots, which, unlike a plain pickle,
+# doesn't mind a long corridor of rooms) as a "prototype", and each world
+# after that is a copy restored from it.
+# the prototype is kept in memory; and, if you give a cache_dir, in a
+# cache file there too (house.json -> house-<hash of its path>.worldc), so
+# that the next process to load the same definition doesn't have to make
+# it either.  nothing is written anywhere unless you ask.
+#
+# a cache file is only used if it was made from the same definition, by
+# the same major version of Python, with the same code: it records a
+# digest of the source of every module that defines a class of something
+# in the world, and if any of those has changed since, it's made again.
+#
+
+from os.path import abspath, basename, join, splitext
+import hashlib
+import importlib
+import json
+import os
+import random
+import struct
+import sys
+try:
+    import cPickle as pickle
+except ImportError:  # Python 3
+    import pickle
+
+from swallows.engine import objects
+from swallows.engine.snapshots import dumps_snapshot, loads_snapshot
+from swallows.story import characters
+
+WORLD_CACHE_MAGIC = b'SWALLOWS-WORLD\x03'
+# a cache file is only any good to the same major version of Python, since
+# it is pickled with the highest protocol that version has
+WORLD_CACHE_HEADER = struct.Struct('<B16s')
+
+
+class World(object):
+    """A world made from a definition.  characters and setting are what a
+    Publisher wants; every character, location and thing is also an
+    attribute of the World, by its id (world.alice, world.revolver.)
+
+    """
+    def __init__(self, characters, setting, actors):
+        self.characters = characters
+        self.setting = setting
+        self.actors = actors
+
+    def __getattr__(self, name):
+        # not self.actors, which would come back here while unpickling
+        actors = self.__dict__.get('actors', {})
+        try:
+            return actors[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def native(value):
+    """Return value, from JSON, with all its strings made into strs.
+    (Under Python 2, JSON strings are unicode, which the rest of the
+    engine doesn't expect.)
+
+    """
+    if isinstance(value, dict):
+        return dict((native(k), native(v)) for (k, v) in value.items())
+    if isinstance(value, list):
+        return [native(v) for v in value]
+    if not isinstance(value, str) and isinstance(value, type(u'')):
+        return value.encode('utf-8')
+    return value
+
+
+def find_class(name):
+    if '.' in name:
+        (module_name, class_name) = name.rsplit('.', 1)
+        class_ = getattr(importlib.import_module(module_name),
+                         class_name, None)
+    else:
+        class_ = (getattr(characters, name, None) or
+                  getattr(objects, name, None))
+    if not (isinstance(class_, type) and issubclass(class_, objects.Actor)):
+        raise ValueError('%s is not a kind of Actor' % name)
+    return class_
+
+
+def build_world(definition):
+    """Make a World from a definition (a dict, as read from the JSON.)
+    Return it, and a list of (thing id, location ids) for the things whose
+    location is to be picked each time a world is made; for now, those
+    things are in the first of their locations.
+
+    """
+    actors = {}
+
+    def add(entry, actor):
+        if entry['id'] in actors:
+            raise ValueError('%s is defined twice' % entry['id'])
+        actors[entry['id']] = actor
+        return actor
+
+    def lookup(id):
+        try:
+            return actors[id]
+        except KeyError:
+            raise ValueError('%s has not been defined' % id)
+
+    def options(entry, *keys):
+        return dict((key, lookup(entry[key]) if key == 'owner' else entry[key])
+                    for key in keys if key in entry)
+
+    cast = []
+    for entry in definition.get('characters', []):
+        class_ = find_class(entry['class'])
+        cast.append(add(entry, class_(entry['name'])))
+
+    setting = []
+    for entry in definition.get('locations', []):
+        class_ = find_class(entry.get('class', 'Location'))
+        setting.append(add(entry, class_(
+            entry['name'], **options(entry, 'enter', 'noun', 'owner')
+        )))
+    # only now that they all exist can they lead to each other
+    for entry in definition.get('locations', []):
+        if 'exits' in entry:
+            actors[entry['id']].set_exits(*[lookup(id)
+                                            for id in entry['exits']])
+
+    choices = []
+    for entry in definition.get('things', []):
+        class_ = find_class(entry['class'])
+        location = entry['location']
+        if isinstance(location, list):
+            choices.append((entry['id'], location))
+            location = location[0]
+        add(entry, class_(entry['name'], location=lookup(location),
+                          **options(entry, 'owner')))
+    # the other locations are only looked up when a world is made, so
+    # make sure now that they're there
+    for (id, locations) in choices:
+        for location in locations:
+            lookup(location)
+
+    for entry in definition.get('characters', []):
+        if 'objects' in entry:
+            actors[entry['id']].configure_objects(**dict(
+                (key, lookup(id)) for (key, id) in entry['objects'].items()
+            ))
+
+    return (World(tuple(cast), tuple(setting), actors), choices)
+
+
+class Prototype(object):
+    """A world, made once from its definition and saved as a snapshot,
+    ready to be copied as often as you like.  modules is a list of (name, digest) for
+    the modules whose code it was made with (see module_digest.)
+
+    """
+    def __init__(self, digest, data, choices, modules):
+        self.digest = digest
+        self.data = data
+        self.choices = choices
+        self.modules = modules
+
+    def instantiate(self, rng=random):
+        """Return a new World.  Wherever the definition leaves it to
+        chance, where things are is up to rng.
+
+        """
+        world = loads_snapshot(self.data)
+        actors = world.actors
+        for (id, locations) in self.choices:
+            actors[id].move_to(rng.choice([actors[l] for l in locations]))
+        return world
+
+
+# module name -> digest of its source
+module_digests = {}
+
+
+def module_digest(name):
+    """Return a digest of the source of the named module, or None if it
+    can't be read.
+
+    """
+    if name not in module_digests:
+        module = sys.modules.get(name) or importlib.import_module(name)
+        filename = getattr(module, '__file__', None) or ''
+        if filename.endswith(('.pyc', '.pyo')):
+            filename = filename[:-1]
+        try:
+            with open(filename, 'rb') as f:
+                module_digests[name] = hashlib.md5(f.read()).digest()
+        except (IOError, OSError):
+            module_digests[name] = None
+    return module_digests[name]
+
+
+def world_modules(world):
+    """Return a list of (name, digest) for every module that defines a
+    class of the world, or of something in it, or a class those are
+    derived from.
+
+    """
+    names = set()
+    for obj in [world] + list(world.actors.values()):
+        for class_ in obj.__class__.__mro__:
+            if class_ is not object:
+                names.add(class_.__module__)
+    return [(name, module_digest(name)) for name in sorted(names)]
+
+
+def cache_filename(filename, cache_dir):
+    # the definition's full path goes in the name, so that two definitions
+    # called house.json don't keep replacing each other's cache file
+    path_digest = hashlib.md5(abspath(filename).encode('utf-8')).hexdigest()
+    return join(cache_dir, '%s-%s.worldc' % (
+        splitext(basename(filename))[0], path_digest[:8]
+    ))
+
+
+def read_cache(filename, digest):
+    """Return the Prototype in the given cache file, if there is one, and
+    it was made from a definition with the given digest by this version
+    of Python, with the code we have now.  Otherwise return None.
+
+    """
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+    offset = len(WORLD_CACHE_MAGIC)
+    if data[:offset] != WORLD_CACHE_MAGIC:
+        return None
+    (version, cached_digest) = WORLD_CACHE_HEADER.unpack_from(data, offset)
+    if version != sys.version_info[0] or cached_digest != digest:
+        return None
+    offset += WORLD_CACHE_HEADER.size
+    try:
+        (data, choices, modules) = pickle.loads(data[offset:])
+    except Exception:
+        # made by some older version of the engine, say.  never mind;
+        # it'll be made again
+        return None
+    for (name, module_digest_then) in modules:
+        try:
+            now = module_digest(name)
+        except ImportError:
+            return None
+        if now is None or now != module_digest_then:
+            return None
+    return Prototype(digest, data, choices, modules)
+
+
+def write_cache(filename, prototype):
+    # written under another name and then renamed, so that nobody else
+    # ever reads half of it.  if it can't be written at all, never mind
+    temporary = '%s.%d' % (filename, os.getpid())
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(WORLD_CACHE_MAGIC)
+            f.write(WORLD_CACHE_HEADER.pack(sys.version_info[0],
+                                            prototype.digest))
+            pickle.dump((prototype.data, prototype.choices,
+                         prototype.modules), f, pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary, filename)
+    except (IOError, OSError):
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+# filename -> the Prototype made from it
+prototypes = {}
+
+
+def compile_world(filename, cache=True, cache_dir=None):
+    """Return the Prototype for the world definition in the given file,
+    making it only if it isn't in memory already -- or, if cache_dir is
+    given, in a cache file in that directory, in which case it's saved
+    there too.  If cache is false, just make it.
+
+    """
+    with open(filename, 'rb') as f:
+        source = f.read()
+    digest = hashlib.md5(source).digest()
+    key = abspath(filename)
+    if cache:
+        prototype = prototypes.get(key)
+        if prototype is not None and prototype.digest == digest:
+            return prototype
+        if cache_dir is not None:
+            prototype = read_cache(cache_filename(filename, cache_dir),
+                                   digest)
+            if prototype is not None:
+                prototypes[key] = prototype
+                return prototype
+
+    (world, choices) = build_world(native(json.loads(source.decode('utf-8'))))
+    prototype = Prototype(
+        digest, dumps_snapshot(world), choices, world_modules(world)
+    )
+    if cache:
+        if cache_dir is not None:
+            write_cache(cache_filename(filename, cache_dir), prototype)
+        prototypes[key] = prototype
+    return prototype
+
+
+def load_world(filename, rng=random, cache=True, cache_dir=None):
+    """Return a new World, made from the definition in the given file.
+    Each World is a copy of its own, which shares nothing with any other.
+    Wherever the definition leaves it to chance, where things are is up
+    to rng; give your own random.Random for a reproducible world.  (For
+    cache and cache_dir, see compile_world.)
+
+    """
+    return compile_world(filename, cache=cache,
+                         cache_dir=cache_dir).instantiate(rng)
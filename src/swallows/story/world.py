@@ -18,14 +18,11 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
+from os.path import abspath, dirname, join
 import random
 
-from swallows.engine.objects import (
-    Location, ProperLocation, Treasure, PluralTreasure,
-    Container, ProperContainer,
-    Item, Weapon, Horror
-)
-from swallows.story.characters import MaleCharacter, FemaleCharacter
+from swallows.engine.seeding import stream
+from swallows.story.loader import load_world
 
 # TODO
 
@@ -44,62 +41,57 @@ from swallows.story.characters import MaleCharacter, FemaleCharacter
 
 ### world ###
 
-alice = FemaleCharacter('Alice')
-bob = MaleCharacter('Bob')
-
-kitchen = Location('kitchen')
-living_room = Location('living room')
-dining_room = Location('dining room')
-front_hall = Location('front hall')
-driveway = Location('driveway', noun="driveway")
-garage = Location('garage', noun="garage")
-path_by_the_shed = Location('path by the shed', noun="path")
-shed = Location('shed', noun="shed")
-upstairs_hall = Location('upstairs hall')
-study = Location('study')
-bathroom = Location('bathroom')
-bobs_bedroom = ProperLocation("<*> bedroom", owner=bob)
-alices_bedroom = ProperLocation("<*> bedroom", owner=alice)
-
-kitchen.set_exits(dining_room, front_hall)
-living_room.set_exits(dining_room, front_hall)
-dining_room.set_exits(living_room, kitchen)
-front_hall.set_exits(kitchen, living_room, driveway, upstairs_hall)
-driveway.set_exits(front_hall, garage, path_by_the_shed)
-garage.set_exits(driveway)
-path_by_the_shed.set_exits(driveway, shed)
-shed.set_exits(path_by_the_shed)
-upstairs_hall.set_exits(bobs_bedroom, alices_bedroom, front_hall, study, bathroom)
-bobs_bedroom.set_exits(upstairs_hall)
-alices_bedroom.set_exits(upstairs_hall)
-study.set_exits(upstairs_hall)
-bathroom.set_exits(upstairs_hall)
-
-house = (kitchen, living_room, dining_room, front_hall, driveway, garage,
-         upstairs_hall, bobs_bedroom, alices_bedroom, study, bathroom,
-         path_by_the_shed, shed)
-
-falcon = Treasure('golden falcon', location=dining_room)
-jewels = PluralTreasure('stolen jewels', location=garage)
-
-cupboards = Container('cupboards', location=kitchen)
-liquor_cabinet = Container('liquor cabinet', location=dining_room)
-mailbox = Container('mailbox', location=driveway)
-
-bobs_bed = ProperContainer("<*> bed", location=bobs_bedroom, owner=bob)
-alices_bed = ProperContainer("<*> bed", location=alices_bedroom, owner=alice)
-
-brandy = Item('bottle of brandy', location=liquor_cabinet)
-revolver = Weapon('revolver', location=random.choice([bobs_bed, alices_bed]))
-dead_body = Horror('dead body', location=bathroom)
-
-# when making alice and bob, we let them recognize certain important
-# objects in their world
-for c in (alice, bob):
-    c.configure_objects(
-        revolver=revolver,
-        brandy=brandy,
-        dead_body=dead_body,
-    )
+# the house, and everyone and everything in it, is defined in house.json.
+# this module makes one copy of it, for those who just want to import
+# alice and bob and get on with it; call load_world(HOUSE) for another.
+# importing this shouldn't touch the global random (or make two imports
+# of it differ) so the copy is always the same one: the revolver starts
+# out in the same bed every time, until you hide_revolver().
+
+HOUSE = join(dirname(abspath(__file__)), 'house.json')
+
+the_house = load_world(HOUSE, rng=stream(0, 'world'))
+
+alice = the_house.alice
+bob = the_house.bob
+
+kitchen = the_house.kitchen
+living_room = the_house.living_room
+dining_room = the_house.dining_room
+front_hall = the_house.front_hall
+driveway = the_house.driveway
+garage = the_house.garage
+path_by_the_shed = the_house.path_by_the_shed
+shed = the_house.shed
+upstairs_hall = the_house.upstairs_hall
+study = the_house.study
+bathroom = the_house.bathroom
+bobs_bedroom = the_house.bobs_bedroom
+alices_bedroom = the_house.alices_bedroom
+
+house = the_house.setting
+
+falcon = the_house.falcon
+jewels = the_house.jewels
+
+cupboards = the_house.cupboards
+liquor_cabinet = the_house.liquor_cabinet
+mailbox = the_house.mailbox
+
+bobs_bed = the_house.bobs_bed
+alices_bed = the_house.alices_bed
+
+brandy = the_house.brandy
+revolver = the_house.revolver
+dead_body = the_house.dead_body
+
+
+def hide_revolver(rng=random):
+    """Put the revolver in one of the beds.  Which one is up to rng, so
+    call this again with your own random.Random for a reproducible world.
+
+    """
+    revolver.move_to(rng.choice([bobs_bed, alices_bed]))
+
 
 ALL_ITEMS = (falcon, jewels, revolver, brandy)
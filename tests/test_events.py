@@ -0,0 +1,289 @@
+#
+# test_events.py: tests for swallows.engine.events.
+#
+# Usage: python -m pytest tests   (or: python -m unittest discover tests)
+#
+
+from os.path import realpath, dirname, join
+import gzip
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.events import (
+    Event, Participants, compile_phrase, EventCollector,
+    ColumnarEventCollector, Publisher, Edition, replay_event_log
+)
+from swallows.engine.objects import Female, Male
+from swallows.engine.scheduling import RoundRobinScheduler
+from swallows.engine.seeding import stream
+from swallows.engine.sinks import MemorySink, FileSink, GzipSink
+from swallows.story.loader import load_world
+from swallows.story.world import HOUSE
+
+
+class ParticipantsTest(unittest.TestCase):
+    def setUp(self):
+        self.alice = Female('Alice')
+        self.bob = Male('Bob')
+        self.event = Event('<1> saw <2>', [self.alice, self.bob])
+        self.assertEqual(str(self.event), 'Alice saw Bob.')
+
+    def test_setitem_invalidates(self):
+        self.event.participants[1] = self.alice
+        self.assertEqual(str(self.event), 'Alice saw Alice.')
+
+    def test_imul_invalidates(self):
+        self.event.participants = [self.alice]
+        self.assertEqual(str(self.event), 'Alice saw <2>.')
+        participants = self.event.participants
+        participants *= 2
+        self.assertEqual(str(self.event), 'Alice saw Alice.')
+
+    @unittest.skipUnless(hasattr(list, 'clear'), 'lists have no clear()')
+    def test_clear_invalidates(self):
+        participants = self.event.participants
+        participants.clear()
+        participants.append(self.bob)
+        self.assertEqual(str(self.event), 'Bob saw <2>.')
+
+
+class PicklingTest(unittest.TestCase):
+    def setUp(self):
+        self.alice = Female('Alice')
+        self.bob = Male('Bob')
+
+    def round_trip(self, obj):
+        # 2 is the highest protocol both Python 2 and 3 can read
+        for protocol in (2, pickle.HIGHEST_PROTOCOL):
+            yield pickle.loads(pickle.dumps(obj, protocol))
+
+    def test_event(self):
+        event = Event("'Hello, <2>,' said <1>", [self.alice, self.bob],
+                      speaker=self.alice, addressed_to=self.bob)
+        for copy in self.round_trip(event):
+            self.assertEqual(str(copy), "'Hello, Bob,' said Alice.")
+            # the kind is the one in the catalog, not a copy of it
+            self.assertTrue(copy.kind is event.kind)
+            self.assertTrue(isinstance(copy.participants, Participants))
+            self.assertTrue(copy.speaker is copy.participants[0])
+            copy.participants[1] = copy.participants[0]
+            self.assertEqual(str(copy), "'Hello, Alice,' said Alice.")
+
+    def test_tokens(self):
+        tokens = compile_phrase('<1> gave <his-1> <indef-3> to <him-2>')
+        for copy in self.round_trip(tokens):
+            self.assertEqual(copy, tokens)
+
+
+class MainCharactersTest(unittest.TestCase):
+    def publisher(self, main_characters=None, editions=(), **kwargs):
+        """Return a Publisher of a fresh house, whose main characters (and
+        those of its editions) are given by name.
+
+        """
+        world = load_world(HOUSE, rng=stream(7, 'world'))
+
+        def cast(names):
+            return [getattr(world, name) for name in names]
+
+        return Publisher(
+            characters=(world.alice, world.bob), setting=world.setting,
+            main_characters=cast(main_characters or ('alice', 'bob')),
+            editions=[Edition(MemorySink(), main_characters=cast(names))
+                      for names in editions] or None,
+            sink=MemorySink(), seed=7, chapters=2, events_per_chapter=200,
+            **kwargs
+        )
+
+    def test_main_character_who_does_not_start_the_chapter(self):
+        # Alice's events come first in every chapter
+        publisher = self.publisher(main_characters=['bob'])
+        publisher.publish()
+        text = publisher.sink.getvalue()
+        self.assertTrue('Bob' in text)
+        # and an IndexedEditor, for an edition, says the same
+        publisher = self.publisher(editions=[['bob']])
+        publisher.publish()
+        self.assertEqual(publisher.editions[0].sink.getvalue(), text)
+
+    def test_level_of_detail_watches_editions_main_characters(self):
+        # Bob's edition has to see everything Bob sees, even though the
+        # Publisher itself only follows Alice
+        publisher = self.publisher(main_characters=['alice'],
+                                   editions=[['bob']], level_of_detail=True)
+        publisher.publish()
+        expected = self.publisher(main_characters=['alice', 'bob'],
+                                  editions=[['bob']], level_of_detail=True)
+        expected.publish()
+        self.assertEqual(publisher.editions[0].sink.getvalue(),
+                         expected.editions[0].sink.getvalue())
+
+
+def describe(event):
+    """Return everything about an event that an Editor could look at."""
+    return (event.phrase, list(event.participants), event.location,
+            event.previous_location(), event.speaker, event.addressed_to,
+            event.excl, event.exciting, str(event))
+
+
+class ColumnarTest(unittest.TestCase):
+    def simulate(self, collector, num_events=300):
+        world = load_world(HOUSE, rng=stream(3, 'world'))
+        characters = (world.alice, world.bob)
+        for character in characters:
+            character.collector = collector
+            character.random = stream(3, 'character', character.name)
+        world.alice.place_in(world.kitchen)
+        world.bob.place_in(world.garage)
+        RoundRobinScheduler(characters).run(collector, num_events)
+        return collector
+
+    def test_same_events(self):
+        events = self.simulate(EventCollector()).events
+        columns = ColumnarEventCollector()
+        for event in events:
+            columns.store(event)
+        self.assertEqual(len(columns), len(events))
+        self.assertEqual([describe(e) for e in columns],
+                         [describe(e) for e in events])
+        self.assertEqual(describe(columns[-1]), describe(events[-1]))
+
+    def test_same_simulation(self):
+        # collecting into columns doesn't change what happens
+        events = self.simulate(EventCollector()).events
+        columns = self.simulate(ColumnarEventCollector())
+        self.assertEqual([str(e) for e in columns], [str(e) for e in events])
+
+    def test_truncate(self):
+        events = self.simulate(EventCollector())
+        columns = ColumnarEventCollector()
+        for event in events.events:
+            columns.store(event)
+        columns.num_collected = events.num_collected
+        self.assertTrue(len(columns) > 250)
+        self.assertEqual(columns.truncate(250), events.truncate(250))
+        self.assertEqual(columns.num_collected, events.num_collected)
+        self.assertEqual([describe(e) for e in columns],
+                         [describe(e) for e in events.events])
+        self.assertEqual(describe(columns.last_event),
+                         describe(events.last_event))
+
+    def test_same_novel(self):
+        texts = []
+        for columnar in (False, True):
+            world = load_world(HOUSE, rng=stream(7, 'world'))
+            publisher = Publisher(
+                characters=(world.alice, world.bob), setting=world.setting,
+                sink=MemorySink(), seed=7, chapters=2,
+                events_per_chapter=300, columnar=columnar
+            )
+            publisher.publish()
+            texts.append(publisher.sink.getvalue())
+        self.assertEqual(texts[0], texts[1])
+
+
+class EventLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_replay(self, friffery):
+        world = load_world(HOUSE, rng=stream(5, 'world'))
+        event_log = join(self.directory, 'chapter-%(chapter)02d.events')
+        publisher = Publisher(
+            characters=(world.alice, world.bob), setting=world.setting,
+            sink=MemorySink(), seed=5, chapters=2, events_per_chapter=300,
+            friffery=friffery, event_log=event_log
+        )
+        publisher.publish()
+        sink = MemorySink()
+        sink.write("Untitled\n========\n\n")
+        for chapter in (1, 2):
+            sink.write("Chapter %d.\n-----------\n\n" % chapter)
+            replay_event_log(event_log % {'chapter': chapter}, sink=sink)
+        self.assertEqual(sink.getvalue(), publisher.sink.getvalue())
+
+    def test_replay_without_friffery(self):
+        self.check_replay(friffery=False)
+
+    def test_replay_with_friffery(self):
+        self.check_replay(friffery=True)
+
+
+class Stopped(Exception):
+    pass
+
+
+class StoppingPublisher(Publisher):
+    """A Publisher that is stopped, as if killed, once it has written the
+    given chapter, but before it has saved a checkpoint for it.
+
+    """
+    def __init__(self, stop_after, **kwargs):
+        Publisher.__init__(self, **kwargs)
+        self.stop_after = stop_after
+
+    def save_checkpoint(self, chapter):
+        if chapter == self.stop_after:
+            raise Stopped()
+        Publisher.save_checkpoint(self, chapter)
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def publish(self, sink, publisher_class=Publisher, resume=False,
+                **kwargs):
+        world = load_world(HOUSE, rng=stream(7, 'world'))
+        publisher = publisher_class(
+            characters=(world.alice, world.bob), setting=world.setting,
+            sink=sink, seed=7, chapters=4, events_per_chapter=200,
+            friffery=True, **kwargs
+        )
+        try:
+            publisher.publish(resume=resume)
+        finally:
+            sink.stream.close()
+
+    def check_resume(self, sink_class, read):
+        expected = join(self.directory, 'expected')
+        self.publish(sink_class(expected))
+        resumed = join(self.directory, 'resumed')
+        checkpoint = join(self.directory, 'resumed.checkpoint')
+        # stopped halfway through, and then carried on from the checkpoint
+        # after the chapter before
+        self.assertRaises(Stopped, self.publish, sink_class(resumed),
+                          publisher_class=StoppingPublisher, stop_after=3,
+                          checkpoint=checkpoint)
+        self.assertNotEqual(read(resumed), read(expected))
+        self.publish(sink_class(resumed, resuming=True), resume=True,
+                     checkpoint=checkpoint)
+        self.assertEqual(read(resumed), read(expected))
+
+    def test_resume(self):
+        def read(filename):
+            with open(filename, 'rb') as f:
+                return f.read()
+        self.check_resume(FileSink, read)
+
+    def test_resume_gzip(self):
+        def read(filename):
+            with gzip.open(filename, 'rb') as f:
+                return f.read()
+        self.check_resume(GzipSink, read)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#
+# test_loader.py: tests for swallows.story.loader.
+#
+# Usage: python -m pytest tests   (or: python -m unittest discover tests)
+#
+
+from os.path import realpath, dirname, join
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+SRC = join(dirname(realpath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+
+from swallows.engine.seeding import stream
+from swallows.story import loader
+from swallows.story.loader import load_world, compile_world
+
+
+class LoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def define(self, definition, name='world.json'):
+        filename = join(self.directory, name)
+        with open(filename, 'w') as f:
+            json.dump(definition, f)
+        return filename
+
+    def corridor(self, length):
+        """Return the filename of a definition of a corridor of rooms, with
+        Alice at one end and a key at one end or the other.
+
+        """
+        def room(n):
+            return 'room_%d' % n
+
+        locations = []
+        for n in range(length):
+            exits = [room(m) for m in (n - 1, n + 1) if 0 <= m < length]
+            locations.append({'id': room(n), 'name': 'room %d' % n,
+                              'exits': exits})
+        return self.define({
+            'characters': [{'id': 'alice', 'class': 'FemaleCharacter',
+                            'name': 'Alice'}],
+            'locations': locations,
+            'things': [{'id': 'key', 'class': 'Item', 'name': 'key',
+                        'location': [room(0), room(length - 1)]}],
+        }, name='corridor.json')
+
+    def test_long_corridor(self):
+        # far longer than pickle could follow exits from room to room
+        filename = self.corridor(3000)
+        # made, then made and cached, then read from the cache
+        for cache_dir in (None, self.directory, self.directory):
+            loader.prototypes.clear()
+            world = load_world(filename, rng=stream(1, 'world'),
+                               cache_dir=cache_dir)
+            self.assertEqual(len(world.setting), 3000)
+            self.assertTrue(world.room_0.exits[0] is world.room_1)
+            self.assertTrue(world.key.location in
+                            (world.room_0, world.room_2999))
+
+    def test_cache(self):
+        filename = self.corridor(10)
+        builds = []
+        build_world = loader.build_world
+
+        def counting_build_world(definition):
+            builds.append(definition)
+            return build_world(definition)
+
+        module_digests = dict(loader.module_digests)
+        loader.build_world = counting_build_world
+        try:
+            for cache_dir in (self.directory, self.directory):
+                loader.prototypes.clear()
+                compile_world(filename, cache_dir=cache_dir)
+            # made once, then read from the cache file
+            self.assertEqual(len(builds), 1)
+            # as if the engine had been changed since
+            loader.module_digests['swallows.engine.objects'] = b'changed'
+            loader.prototypes.clear()
+            compile_world(filename, cache_dir=self.directory)
+            self.assertEqual(len(builds), 2)
+            # and as if the definition had
+            with open(filename, 'a') as f:
+                f.write('\n')
+            compile_world(filename, cache_dir=self.directory)
+            self.assertEqual(len(builds), 3)
+        finally:
+            loader.build_world = build_world
+            loader.module_digests.clear()
+            loader.module_digests.update(module_digests)
+
+
+class ImportTest(unittest.TestCase):
+    def check_imports_first(self, statement):
+        # in a process of its own, where nothing has been imported yet
+        subprocess.check_call([
+            sys.executable, '-c',
+            'import sys; sys.path.insert(0, %r); %s' % (SRC, statement)
+        ])
+
+    def test_loader(self):
+        self.check_imports_first(
+            'from swallows.story.loader import load_world'
+        )
+
+    def test_generator(self):
+        self.check_imports_first(
+            'from swallows.story.generator import generate_world'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+#
+# test_objects.py: tests for swallows.engine.objects.
+#
+# Usage: python -m pytest tests   (or: python -m unittest discover tests)
+#
+
+from os.path import realpath, dirname, join
+import pickle
+import sys
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.events import Event
+from swallows.engine.objects import (
+    BeliefSet, ItemLocation, Goal, Desire, Contents, Location,
+    ProperLocation, Male, Female, Item, Weapon, Container, Treasure, Horror
+)
+
+
+class ContentsTest(unittest.TestCase):
+    def setUp(self):
+        self.hall = Location('hall')
+        self.study = Location('study')
+        self.alice = Female('Alice')
+        self.bob = Male('Bob')
+        self.alice.place_in(self.hall)
+        self.bob.place_in(self.hall)
+        self.desk = Container('desk', location=self.hall)
+        self.pen = Item('pen', location=self.hall)
+        self.revolver = Weapon('revolver', location=self.hall)
+        self.jewels = Treasure('jewels', location=self.desk)
+        self.body = Horror('dead body', location=self.study)
+
+    def check_indexes(self, contents):
+        """Check that each of the typed indexes of contents holds exactly
+        the members that belong in it, in the same order.
+
+        """
+        members = list(contents)
+        self.assertEqual(len(contents), len(members))
+        for name in ('animate', 'container', 'notable', 'takeable'):
+            self.assertEqual(
+                list(getattr(contents, name + 's')),
+                [actor for actor in members if getattr(actor, name)()]
+            )
+
+    def check_all(self):
+        for location in (self.hall, self.study, self.desk):
+            self.check_indexes(location.contents)
+
+    def test_place_in(self):
+        self.assertEqual(list(self.hall.contents), [
+            self.alice, self.bob, self.desk, self.pen, self.revolver
+        ])
+        self.assertEqual(list(self.hall.contents.animates),
+                         [self.alice, self.bob])
+        self.assertEqual(list(self.hall.contents.notables),
+                         [self.alice, self.bob, self.revolver])
+        self.check_all()
+
+    def test_move_to(self):
+        self.bob.move_to(self.study)
+        self.revolver.move_to(self.bob)
+        self.jewels.move_to(self.study)
+        self.check_all()
+        self.check_indexes(self.bob.contents)
+        self.assertEqual(list(self.hall.contents.animates), [self.alice])
+        self.assertEqual(list(self.study.contents.notables),
+                         [self.body, self.bob, self.jewels])
+        self.assertEqual(list(self.desk.contents), [])
+        self.assertFalse(self.jewels in self.desk.contents)
+        # and back again, to the end of the line
+        self.bob.move_to(self.hall)
+        self.check_all()
+        self.assertEqual(list(self.hall.contents.animates),
+                         [self.alice, self.bob])
+
+    def test_remove_what_is_not_there(self):
+        self.assertRaises(KeyError, self.study.contents.remove, self.pen)
+        self.check_all()
+
+    def test_pickle(self):
+        self.bob.move_to(self.study)
+        self.bob.move_to(self.hall)
+        # 2 is the highest protocol both Python 2 and 3 can read
+        for protocol in (2, pickle.HIGHEST_PROTOCOL):
+            copy = pickle.loads(pickle.dumps(self.hall, protocol))
+            self.assertTrue(isinstance(copy.contents, Contents))
+            self.check_indexes(copy.contents)
+            self.assertEqual([actor.name for actor in copy.contents],
+                             ['Alice', 'desk', 'pen', 'revolver', 'Bob'])
+
+
+class BeliefSetTest(unittest.TestCase):
+    def setUp(self):
+        self.kitchen = Location('kitchen')
+        self.garage = Location('garage')
+        self.brandy = Item('brandy')
+        self.revolver = Weapon('revolver')
+        self.jewels = Treasure('jewels')
+        self.beliefs = BeliefSet()
+
+    def check_indexes(self):
+        """Check that the indexes of the BeliefSet say what its beliefs
+        say, and nothing else.
+
+        """
+        located_at = {}
+        of_class = {}
+        for (subject, beliefs) in self.beliefs.belief_map.items():
+            belief = beliefs.get(ItemLocation)
+            if belief is not None:
+                located_at.setdefault(belief.location, {})[subject] = belief
+            for (class_, belief) in beliefs.items():
+                of_class.setdefault(class_, {})[subject] = belief
+        self.assertEqual(self.beliefs.located_at, located_at)
+        self.assertEqual(self.beliefs.of_class, of_class)
+
+    def locate(self, thing, location):
+        self.beliefs.add(ItemLocation(thing, location))
+        self.check_indexes()
+
+    def test_beliefs_located_at(self):
+        self.locate(self.revolver, self.kitchen)
+        self.locate(self.brandy, self.garage)
+        self.locate(self.jewels, self.kitchen)
+        self.assertEqual(
+            [b.subject for b in self.beliefs.beliefs_located_at(self.kitchen)],
+            [self.revolver, self.jewels]
+        )
+        # believing it's somewhere else takes it out of the kitchen
+        self.locate(self.revolver, self.garage)
+        self.assertEqual(
+            [b.subject for b in self.beliefs.beliefs_located_at(self.garage)],
+            [self.revolver, self.brandy]
+        )
+        # believing the brandy is still in the garage changes nothing, and
+        # forgetting where the jewels are leaves nothing in the kitchen
+        self.locate(self.brandy, self.garage)
+        self.beliefs.remove(ItemLocation(self.jewels))
+        self.check_indexes()
+        self.assertEqual(self.beliefs.beliefs_located_at(self.kitchen), [])
+        self.assertFalse(self.kitchen in self.beliefs.located_at)
+
+    def test_beliefs_of_class(self):
+        self.beliefs.add(Desire(self.jewels))
+        self.locate(self.revolver, self.kitchen)
+        self.beliefs.add(Goal(self.brandy, 'drink'))
+        self.beliefs.add(Desire(self.brandy))
+        self.beliefs.add(Goal(self.jewels, 'steal'))
+        self.check_indexes()
+
+        def subjects(class_, subclasses=False):
+            return [(b.__class__, b.subject) for b in
+                    self.beliefs.beliefs_of_class(class_, subclasses)]
+
+        # in the order their subjects were first believed about
+        self.assertEqual(subjects(Desire),
+                         [(Desire, self.jewels), (Desire, self.brandy)])
+        self.assertEqual(subjects(Goal),
+                         [(Goal, self.jewels), (Goal, self.brandy)])
+        self.assertEqual(subjects(Goal, subclasses=True), [
+            (Desire, self.jewels), (Goal, self.jewels),
+            (Desire, self.brandy), (Goal, self.brandy),
+        ])
+        self.beliefs.remove(Desire(self.jewels))
+        self.beliefs.remove(Desire(self.brandy))
+        self.check_indexes()
+        self.assertEqual(subjects(Desire), [])
+        self.assertFalse(Desire in self.beliefs.of_class)
+        self.assertEqual(subjects(ItemLocation),
+                         [(ItemLocation, self.revolver)])
+
+    def test_lookup_and_discard(self):
+        self.locate(self.revolver, self.kitchen)
+        self.beliefs.add(Desire(self.revolver))
+        belief = self.beliefs.lookup(ItemLocation, self.revolver)
+        self.assertTrue(belief.location is self.kitchen)
+        self.assertTrue(self.beliefs.get(ItemLocation(self.revolver))
+                        is belief)
+        # looking up, or discarding, what isn't there makes nothing new
+        self.assertTrue(self.beliefs.lookup(ItemLocation, self.brandy)
+                        is None)
+        self.assertTrue(self.beliefs.lookup(Goal, self.revolver) is None)
+        self.beliefs.discard(ItemLocation, self.brandy)
+        self.beliefs.discard(Goal, self.revolver)
+        self.assertEqual(list(self.beliefs.subjects()), [self.revolver])
+        self.assertEqual(sorted(self.beliefs.of_class, key=str),
+                         sorted([ItemLocation, Desire], key=str))
+        self.check_indexes()
+        self.beliefs.discard(ItemLocation, self.revolver)
+        self.check_indexes()
+        self.assertTrue(self.beliefs.lookup(ItemLocation, self.revolver)
+                        is None)
+        self.assertTrue(self.beliefs.lookup(Desire, self.revolver)
+                        is not None)
+
+    def test_animate(self):
+        bob = Male('Bob')
+        bob.remember_location(self.brandy, self.kitchen)
+        self.assertTrue(bob.recall_location(self.brandy).location
+                        is self.kitchen)
+        bob.forget_location(self.brandy)
+        bob.forget_location(self.brandy)
+        self.assertTrue(bob.recall_location(self.brandy) is None)
+        self.assertEqual(bob.beliefs.located_at, {})
+
+
+class RenderingTest(unittest.TestCase):
+    def setUp(self):
+        self.alice = Female('Alice')
+        self.bob = Male('Bob')
+        self.bedroom = ProperLocation('<*> bedroom', owner=self.bob)
+        self.apple = Item('apple')
+
+    def test_perspectives(self):
+        bedroom = self.bedroom
+        self.assertEqual(bedroom.render(), "Bob's bedroom")
+        said_by_bob = Event("'Come to <2>,' said <1>", [self.bob, bedroom],
+                            speaker=self.bob, addressed_to=self.alice)
+        said_to_bob = Event("'Go to <2>,' said <1>", [self.alice, bedroom],
+                            speaker=self.alice, addressed_to=self.bob)
+        done_by_bob = Event("<1> went to <2>", [self.bob, bedroom])
+        done_by_alice = Event("<1> went to <2>", [self.alice, bedroom])
+        self.assertEqual(bedroom.render(said_by_bob), 'my bedroom')
+        self.assertEqual(bedroom.render(said_to_bob), 'your bedroom')
+        self.assertEqual(bedroom.render(done_by_bob), 'his bedroom')
+        self.assertEqual(bedroom.render(done_by_alice), "Bob's bedroom")
+        self.assertEqual(str(done_by_bob), 'Bob went to his bedroom.')
+
+    def test_renamed(self):
+        self.assertEqual(self.apple.render(), 'the apple')
+        self.assertEqual(self.apple.indefinite(), 'an apple')
+        self.apple.name = 'pear'
+        self.assertEqual(self.apple.render(), 'the pear')
+        self.assertEqual(self.apple.indefinite(), 'a pear')
+
+    def test_new_owner(self):
+        self.bedroom.owner = self.alice
+        self.assertEqual(self.bedroom.render(), "Alice's bedroom")
+        done_by_alice = Event("<1> went to <2>", [self.alice, self.bedroom])
+        self.assertEqual(self.bedroom.render(done_by_alice), 'her bedroom')
+        self.bedroom.owner = self.bob
+        self.assertEqual(self.bedroom.render(done_by_alice), "Bob's bedroom")
+
+
+if __name__ == '__main__':
+    unittest.main()
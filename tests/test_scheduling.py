@@ -0,0 +1,71 @@
+#
+# test_scheduling.py: tests for swallows.engine.scheduling.
+#
+# Usage: python -m pytest tests   (or: python -m unittest discover tests)
+#
+
+from os.path import realpath, dirname, join
+import sys
+import unittest
+
+# get the ../src/ directory onto the Python module search path
+sys.path.insert(0, join(dirname(realpath(__file__)), '..', 'src'))
+
+from swallows.engine.events import EventCollector, StreamingEventCollector
+from swallows.engine.objects import Location, Male
+from swallows.engine.scheduling import PriorityScheduler
+
+
+class Pacer(Male):
+    """Yawns, then goes to the other room: two events a turn, the second
+    of which changes the world.
+
+    """
+    __slots__ = ()
+
+    def live(self):
+        self.emit("<1> yawned", [self])
+        self.move_to(self.location.exits[0])
+
+
+class ExactBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.hall = Location('hall')
+        self.study = Location('study')
+        self.hall.set_exits(self.study)
+        self.study.set_exits(self.hall)
+        self.bob = Pacer('Bob')
+
+    def start(self, collector):
+        self.bob.collector = collector
+        self.bob.place_in(self.hall)
+
+    def check_trimmed(self, phrases, scheduler):
+        # "Bob was in the hall.  Bob yawned.  Bob went to the study.  Bob
+        # yawned." and then the budget ran out, halfway through his turn
+        self.assertEqual(phrases, ['<1> <was-1> in <2>', '<1> yawned',
+                                   '<1> went to <2>', '<1> yawned'])
+        self.assertEqual(scheduler.stats.trimmed, 1)
+        # the event that says he went back to the hall was dropped, but he
+        # still went back there
+        self.assertTrue(self.bob.location is self.hall)
+
+    def test_run_trims_events_but_not_what_they_did(self):
+        scheduler = PriorityScheduler([self.bob])
+        collector = EventCollector()
+        self.start(collector)
+        scheduler.run(collector, 4)
+        self.assertEqual(collector.num_collected, 4)
+        self.check_trimmed([e.phrase for e in collector.events], scheduler)
+
+    def test_streaming_trims_events_but_not_what_they_did(self):
+        scheduler = PriorityScheduler([self.bob])
+        collector = StreamingEventCollector([self.bob], 4,
+                                            scheduler=scheduler)
+        self.start(collector)
+        phrases = [e.phrase for e in collector.stream()]
+        self.check_trimmed(phrases, scheduler)
+
+
+if __name__ == '__main__':
+    unittest.main()